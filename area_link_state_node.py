@@ -0,0 +1,321 @@
+from router_lsa_node import Router_LSA_Node, lsa_values, read_lsas
+from simulator.codec import register_schema, pack_ints, unpack_ints
+from collections import namedtuple
+
+
+# What Area_Link_State_Node sends.  Inside an area: the sender's area, and the router LSAs
+# and summaries a neighbor is owed (none in a hello).  A summary lists a border router's
+# routes out of the area as (destination, cost, area path) entries.  Over a border link:
+# a vector of (destination, cost, area path) entries.  Area paths are tuples of areas.
+Area_LSA_Update = namedtuple('Area_LSA_Update', ['sender', 'area', 'lsas', 'summaries'])
+Area_Summary = namedtuple('Area_Summary', ['router', 'seq_num', 'routes'])
+Area_Vector = namedtuple('Area_Vector', ['sender', 'seq_num', 'routes'])
+
+
+# Binary forms, all packed with pack_ints.  Routes are the number of routes, then
+# destination, cost, length of the area path and the area path of every route.
+# Area_LSA_Update: sender, area, the LSAs as in Router_LSA_Update, the number of
+# summaries, then router, sequence number and routes of every summary.
+# Area_Vector: sender, sequence number and routes.
+def route_values(routes):
+    values = [len(routes)]
+    for d, cost, path in routes:
+        values += (d, cost, len(path))
+        values += path
+    return values
+
+
+def read_routes(values, i):
+    # the routes starting at values[i], and the index after them
+    routes, i = [], i + 1
+    for _ in range(values[i - 1]):
+        end = i + 3 + values[i + 2]
+        routes.append((values[i], values[i + 1], values[i + 3:end]))
+        i = end
+    return tuple(routes), i
+
+
+def pack_lsa_update(m):
+    values = [m.sender, m.area] + lsa_values(m.lsas) + [len(m.summaries)]
+    for router, seq_num, routes in m.summaries:
+        values += [router, seq_num] + route_values(routes)
+    return pack_ints(values)
+
+
+def unpack_lsa_update(data, offset):
+    values = unpack_ints(data, offset)
+    lsas, i = read_lsas(values, 2)
+    summaries, count, i = [], values[i], i + 1
+    for _ in range(count):
+        routes, end = read_routes(values, i + 2)
+        summaries.append(Area_Summary(values[i], values[i + 1], routes))
+        i = end
+    return Area_LSA_Update(values[0], values[1], lsas, tuple(summaries))
+
+
+def pack_vector(m):
+    return pack_ints([m.sender, m.seq_num] + route_values(m.routes))
+
+
+def unpack_vector(data, offset):
+    values = unpack_ints(data, offset)
+    return Area_Vector(values[0], values[1], read_routes(values, 2)[0])
+
+
+register_schema(Area_LSA_Update, 8, pack_lsa_update, unpack_lsa_update)
+register_schema(Area_Vector, 9, pack_vector, unpack_vector)
+
+
+# Link state split into areas (SET_AREA).  Router LSAs are flooded only inside an area,
+# so a node knows the topology of its own area and nothing else.
+# Area border routers, nodes with a link into another area, trade distance vectors
+# over those links, each route carrying the list of areas it goes through so no route
+# ever comes back into an area it has left.  What a border router learns this way it
+# floods into its own area as one summary LSA: destination -> (cost, area path).
+# Routes to another area go through the border router with the cheapest
+# distance to it + summarized cost.  Paths that leave an area and come back
+# into it are never used.
+# Every LSA message carries its sender's area, so it doubles as a hello.  Like the
+# parent, LSAs and summaries are batched per neighbor until the end of the time.
+class Area_Link_State_Node(Router_LSA_Node):
+    def __init__(self, id):
+        super().__init__(id)
+        self.neighborAreas = {} # neighbor -> area, from its hello; taken to be ours until then
+        self.summaries = {} # border router of our area -> (sequence number, {destination: (cost, area path)})
+        self.external = {} # neighbor in another area -> (sequence number, {destination: (cost, area path)})
+        self.sent = {} # neighbor in another area -> routes last sent to it
+        self.vectorNumber = 0
+        self.table = None # destination -> next hop, rebuilt on the next query after a change
+        self.pendingSummaries = {} # neighbor -> border routers whose summary it gets at the end of the current time
+
+    def __str__(self):
+        return (
+            f"Node {self.id} (area {self.area})\n"
+            f"Neighbors: {self.neighbors}\n"
+            f"Neighbor areas: {self.neighborAreas}\n"
+            f"LSAs: {self.lsas}\n"
+            f"Summaries: {self.summaries}\n"
+        )
+
+    def database_size(self):
+        return (len(self.dataBase)
+                + sum(len(routes) for _, routes in self.summaries.values())
+                + sum(len(routes) for _, routes in self.external.values()))
+
+    def areaNeighbors(self):
+        return [n for n in self.neighbors if self.neighborAreas.get(n, self.area) == self.area]
+
+    def borderNeighbors(self):
+        return [n for n in self.neighbors if n in self.neighborAreas and self.neighborAreas[n] != self.area]
+
+    def originate(self):
+        self.sequenceNumber += 1
+        self.install(self.id, self.sequenceNumber, {n: self.neighbors[n] for n in self.areaNeighbors()})
+
+    def link_has_been_updated(self, neighbor, latency):
+        # latency = -1 if delete a link
+        wasAreaNeighbor = neighbor in self.areaNeighbors()
+        isNew = latency != -1 and neighbor not in self.neighbors
+        if latency == -1:
+            self.neighbors.pop(neighbor, None)
+            self.neighborAreas.pop(neighbor, None)
+            self.external.pop(neighbor, None)
+            self.sent.pop(neighbor, None)
+        else:
+            self.neighbors[neighbor] = latency
+        if wasAreaNeighbor or isNew:
+            self.originate()
+        if isNew:
+            self.sendHello([neighbor])
+            self.sendArea([neighbor], list(self.lsas), list(self.summaries))
+        if wasAreaNeighbor or isNew:
+            self.sendArea([n for n in self.areaNeighbors() if n != neighbor or not isNew], [self.id], [])
+        self.scheduleRefresh()
+
+    def area_has_been_updated(self, area):
+        if area == self.area:
+            return
+        self.area = area
+        # everything we knew about the old area is useless now
+        self.lsas, self.summaries, self.sent = {}, {}, {}
+        self.dataBase, self.adjacency, self.routes = {}, {}, None
+        for neighbor in self.areaNeighbors():
+            self.external.pop(neighbor, None)
+        self.pendingLSAs, self.pendingSummaries = {}, {}
+        self.sendHello(list(self.neighbors))
+        self.originate()
+        self.sendArea(self.areaNeighbors(), [self.id], [])
+        self.scheduleRefresh()
+
+    def sendHello(self, neighbors):
+        # an LSA message with no LSAs, sent for the area it carries
+        self.sendArea(neighbors, [], [], hello=True)
+
+    def sendArea(self, neighbors, routers, borderRouters, hello=False):
+        if not neighbors or (not routers and not borderRouters and not hello):
+            return
+        if not self.COALESCE:
+            self.sendAreaNow(neighbors, routers, borderRouters)
+            return
+        for neighbor in neighbors:
+            self.pendingLSAs.setdefault(neighbor, {}).update(dict.fromkeys(routers))
+            self.pendingSummaries.setdefault(neighbor, {}).update(dict.fromkeys(borderRouters))
+        self.request_end_of_tick()
+
+    def summaryRecord(self, router):
+        sequenceNumber, routes = self.summaries[router]
+        return Area_Summary(router, sequenceNumber, tuple((d, cost, path) for d, (cost, path) in routes.items()))
+
+    def sendAreaNow(self, neighbors, routers, borderRouters):
+        message = Area_LSA_Update(self.id, self.area, tuple(self.lsaRecord(router) for router in routers),
+                                  tuple(self.summaryRecord(router) for router in borderRouters))
+        if len(neighbors) == len(self.neighbors):
+            self.send_to_neighbors(message)
+        else:
+            for neighbor in neighbors:
+                self.send_to_neighbor(neighbor, message)
+
+    def process_incoming_routing_message(self, m):
+        sender = m.sender
+        if isinstance(m, Area_LSA_Update):
+            self.processHello(sender, m.area)
+            if m.area == self.area:
+                self.processArea(sender, m.lsas, m.summaries)
+        elif sender in self.neighbors and m.seq_num > self.external.get(sender, (0, {}))[0]:
+            self.external[sender] = (m.seq_num, {d: (cost, path) for d, cost, path in m.routes})
+        self.scheduleRefresh()
+
+    def processHello(self, neighbor, area):
+        if neighbor not in self.neighbors or self.neighborAreas.get(neighbor) == area:
+            return
+        wasAreaNeighbor = self.neighborAreas.get(neighbor, self.area) == self.area
+        self.neighborAreas[neighbor] = area
+        self.sent.pop(neighbor, None)
+        if area == self.area and not wasAreaNeighbor:
+            self.external.pop(neighbor, None)
+            self.sendArea([neighbor], list(self.lsas), list(self.summaries))
+        if (area == self.area) != wasAreaNeighbor:
+            self.originate()
+            self.sendArea(self.areaNeighbors(), [self.id], [])
+
+    def processArea(self, sender, lsas, summaries):
+        changed, changedSummaries = [], []
+        for router, sequenceNumber, links in lsas:
+            if router == self.id:
+                # our own LSA from before a restart: outbid it
+                if sequenceNumber > self.sequenceNumber or (
+                        sequenceNumber == self.sequenceNumber and dict(links) != self.lsas[self.id][1]):
+                    self.sequenceNumber = sequenceNumber
+                    self.originate()
+                    self.sendArea(self.areaNeighbors(), [self.id], [])
+            elif sequenceNumber > self.lsas.get(router, (0, {}))[0]:
+                self.install(router, sequenceNumber, dict(links))
+                changed.append(router)
+        for router, sequenceNumber, routes in summaries:
+            if router == self.id:
+                ownNumber, ownRoutes = self.summaries.get(self.id, (0, {}))
+                routes = {d: (cost, path) for d, cost, path in routes}
+                if sequenceNumber > ownNumber or (sequenceNumber == ownNumber and routes != ownRoutes):
+                    # our summary from before a restart: outbid it
+                    self.summaries[self.id] = (sequenceNumber, ownRoutes)
+                    self.originateSummary(ownRoutes, force=True)
+            elif sequenceNumber > self.summaries.get(router, (0, {}))[0]:
+                self.summaries[router] = (sequenceNumber, {d: (cost, path) for d, cost, path in routes})
+                changedSummaries.append(router)
+        self.sendArea([n for n in self.areaNeighbors() if n != sender], changed, changedSummaries)
+
+    def externalRoutes(self):
+        # best route to every destination outside our area through our own border links
+        best = {}
+        for neighbor in sorted(self.borderNeighbors()):
+            cost = self.neighbors[neighbor]
+            routes = self.external.get(neighbor, (0, {}))[1]
+            for d, (c, path) in routes.items():
+                if self.area in path or d == self.id:
+                    continue
+                if d not in best or (cost + c, len(path)) < best[d][:2]:
+                    best[d] = (cost + c, len(path), path, neighbor)
+        return best
+
+    def originateSummary(self, routes, force=False):
+        sequenceNumber, old = self.summaries.get(self.id, (0, {}))
+        if routes == old and not force:
+            return
+        if not routes and self.id not in self.summaries:
+            return
+        self.summaries[self.id] = (sequenceNumber + 1, routes)
+        self.sendArea(self.areaNeighbors(), [], [self.id])
+
+    def routesFromHere(self, external):
+        # cost, area path and next hop of our best route to every destination we know of
+        routes = {self.id: (0, (self.area,), None)}
+        tree = self.routingTree()
+        if tree is not None:
+            for d, cost in tree.dist.items():
+                if d != self.id:
+                    routes[d] = (cost, (self.area,), tree.get_first_hop(d))
+        candidates = {d: (cost, len(path), path, neighbor) for d, (cost, _, path, neighbor) in external.items()}
+        if tree is not None:
+            for router, (_, summary) in self.summaries.items():
+                if router == self.id or router not in tree.dist:
+                    continue
+                distance, hop = tree.dist[router], tree.get_first_hop(router)
+                for d, (cost, path) in summary.items():
+                    if self.area in path:
+                        continue
+                    key = (distance + cost, len(path))
+                    if d not in candidates or key < candidates[d][:2]:
+                        candidates[d] = key + (path, hop)
+        for d, (cost, _, path, hop) in candidates.items():
+            if d not in routes:
+                routes[d] = (cost, path, hop)
+        return routes
+
+    def scheduleRefresh(self):
+        self.table = None
+        if not self.borderNeighbors() and self.id not in self.summaries:
+            # nothing to summarize or advertise, as refresh would find
+            return
+        if self.COALESCE:
+            self.request_end_of_tick()
+        else:
+            self.refresh()
+
+    def end_of_tick(self):
+        self.refresh()
+        # one message per distinct set of LSAs and summaries, the newest copy of each
+        pending, self.pendingLSAs = self.pendingLSAs, {}
+        summaries, self.pendingSummaries = self.pendingSummaries, {}
+        groups = {}
+        for neighbor, routers in pending.items():
+            if neighbor in self.neighbors:
+                groups.setdefault((tuple(routers), tuple(summaries[neighbor])), []).append(neighbor)
+        for (routers, borderRouters), neighbors in groups.items():
+            self.sendAreaNow(neighbors, routers, borderRouters)
+
+    def refresh(self):
+        self.table = None
+        neighbors = self.borderNeighbors()
+        if not neighbors and self.id not in self.summaries:
+            return
+        external = self.externalRoutes()
+        self.originateSummary({d: (cost, path) for d, (cost, _, path, _) in external.items()})
+        if not neighbors:
+            return
+
+        routes = self.routesFromHere(external)
+        for neighbor in neighbors:
+            area = self.neighborAreas[neighbor]
+            advertised = tuple((d, cost, (self.area,) + path if path[0] != self.area else path)
+                               for d, (cost, path, hop) in sorted(routes.items())
+                               if area not in path and hop != neighbor)
+            if advertised != self.sent.get(neighbor):
+                self.sent[neighbor] = advertised
+                self.vectorNumber += 1
+                self.send_to_neighbor(neighbor, Area_Vector(self.id, self.vectorNumber, advertised))
+
+    def get_next_hop(self, destination):
+        if self.table is None:
+            self.table = {d: hop for d, (_, _, hop) in self.routesFromHere(self.externalRoutes()).items()}
+        hop = self.table.get(destination)
+        return -1 if hop is None else hop
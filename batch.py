@@ -0,0 +1,204 @@
+import argparse
+import contextlib
+import csv
+import io
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from simulator.config import *
+from simulator.codec import CODECS
+from sim import Sim
+
+
+DEFAULT_PATHS = ["testing_suite", "adversarial_cases"]
+DEFAULT_ALGORITHMS = ["LINK_STATE", "DISTANCE_VECTOR"]
+
+CSV_FIELDS = ["event_file", "algorithm", "status", "checks", "passed", "failed",
+              "message_count", "byte_count", "dropped_count", "database_size_mean", "database_size_max",
+              "link_bytes_max", "wall_time", "peak_rss_kb", "failed_checks", "error"]
+
+
+class Timeout(Exception):
+    pass
+
+
+def on_timeout(signum, frame):
+    raise Timeout()
+
+
+def peak_rss_kb():
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def run_one(job):
+    event_file, algorithm, timeout, drop_in_flight, check_messages, codec, convergence = job
+    result = {
+        "event_file": event_file,
+        "algorithm": algorithm,
+        "status": "error",
+        "checks": [],
+        "message_count": None,
+        "byte_count": None,
+        "dropped_count": None,
+        "database_size_mean": None,
+        "database_size_max": None,
+        "bytes_by_type": None,
+        "link_bytes_max": None,
+        "convergence": None,
+        "wall_time": None,
+        "peak_rss_kb": None,
+        "error": None,
+    }
+    use_alarm = timeout and hasattr(signal, "SIGALRM")
+    start = time.perf_counter()
+    s = None
+    try:
+        if use_alarm:
+            signal.signal(signal.SIGALRM, on_timeout)
+            signal.alarm(timeout)
+        # the simulator prints its verdicts, the batch only keeps the recorded checks
+        with contextlib.redirect_stdout(io.StringIO()):
+            s = Sim(algorithm, event_file, 'NO_STOP', render=False, drop_in_flight=drop_in_flight,
+                    check_messages=check_messages, codec=codec,
+                    convergence=convergence is not None, check_convergence=convergence == 'check')
+        result["status"] = "pass" if all(c["correct"] for c in s.checks) else "fail"
+    except Timeout:
+        result["status"] = "timeout"
+        result["error"] = "timed out after %d seconds" % timeout
+    except (Exception, SystemExit) as e:
+        # a broken scenario must not take the whole batch down
+        result["error"] = "%s: %s\n%s" % (type(e).__name__, e, traceback.format_exc())
+    finally:
+        if use_alarm:
+            signal.alarm(0)
+    result["wall_time"] = time.perf_counter() - start
+    result["peak_rss_kb"] = peak_rss_kb()
+    if s is not None:
+        result["checks"] = s.checks
+        result["message_count"] = s.message_count
+        result["byte_count"] = s.byte_count
+        result["dropped_count"] = s.dropped_count
+        sizes = s.database_sizes()
+        if sizes:
+            result["database_size_mean"] = sum(sizes) / len(sizes)
+            result["database_size_max"] = max(sizes)
+        if s.codec is not None:
+            result["bytes_by_type"] = {t: {"messages": count, "bytes": size} for t, (count, size) in s.type_bytes.items()}
+            result["link_bytes_max"] = s.busiest_link()[1]
+        if s.convergence is not None:
+            result["convergence"] = s.convergence.records
+    return result
+
+
+def find_event_files(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(os.path.join(path, f) for f in os.listdir(path) if f.endswith(".event")))
+        else:
+            files.append(path)
+    return files
+
+
+def csv_row(result):
+    checks = result["checks"]
+    failed = ["%s %s" % (c["command"], " ".join(str(a) for a in c["args"])) for c in checks if not c["correct"]]
+    return {
+        "event_file": result["event_file"],
+        "algorithm": result["algorithm"],
+        "status": result["status"],
+        "checks": len(checks),
+        "passed": len(checks) - len(failed),
+        "failed": len(failed),
+        "message_count": result["message_count"],
+        "byte_count": result["byte_count"],
+        "dropped_count": result["dropped_count"],
+        "database_size_mean": result["database_size_mean"],
+        "database_size_max": result["database_size_max"],
+        "link_bytes_max": result["link_bytes_max"],
+        "wall_time": "%.3f" % result["wall_time"],
+        "peak_rss_kb": result["peak_rss_kb"],
+        "failed_checks": ";".join(failed),
+        "error": (result["error"] or "").split("\n")[0],
+    }
+
+
+def run_batch(event_files, algorithms, jobs=None, timeout=None, max_tasks_per_child=1, drop_in_flight=False,
+              check_messages=False, codec='none', convergence=None):
+    work = [(f, a, timeout, drop_in_flight, check_messages, codec, convergence) for f in event_files for a in algorithms]
+    with multiprocessing.Pool(jobs or os.cpu_count(), maxtasksperchild=max_tasks_per_child) as pool:
+        results = []
+        for result in pool.imap(run_one, work):
+            row = csv_row(result)
+            print("%-8s %-16s %-45s %3s/%-3s checks, %9s messages, %8ss"
+                  % (row["status"].upper(), row["algorithm"], row["event_file"], row["passed"],
+                     row["checks"], row["message_count"], row["wall_time"]))
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run event files with several routing algorithms in parallel and collect the results.')
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS,
+                        help='event files or directories of .event files (default: %s)' % " ".join(DEFAULT_PATHS))
+    parser.add_argument('--algorithms', nargs='+', default=DEFAULT_ALGORITHMS, choices=ROUTE_ALGORITHM,
+                        help='algorithms to run every event file with')
+    parser.add_argument('--jobs', type=int, default=None,
+                        help='number of worker processes (default: number of cores)')
+    parser.add_argument('--timeout', type=int, default=None,
+                        help='seconds before a single run is abandoned')
+    parser.add_argument('--max-tasks-per-child', type=int, default=1,
+                        help='restart workers after this many runs (default 1: every run pays for a fresh '
+                             'worker, some tens of ms, but its peak RSS is its own; higher values keep the '
+                             'workers, which is faster, but the peak RSS is then the worker\'s peak so '
+                             'far, which hides any run smaller than an earlier one)')
+    parser.add_argument('--drop-in-flight', action='store_true',
+                        help='drop messages still on a link when it is deleted')
+    parser.add_argument('--check-messages', action='store_true',
+                        help='check that structured messages are immutable when they are sent')
+    parser.add_argument('--codec', default='none', choices=['none'] + list(CODECS),
+                        help='encode messages on the links with this codec and count their bytes')
+    parser.add_argument('--convergence', nargs='?', const='quiet', default=None, choices=['quiet', 'check'],
+                        help='record the convergence of every batch of topology changes in the JSON results; '
+                             'with "check", also compare the next hops with the shortest paths once quiet')
+    parser.add_argument('--json', dest='json_file', default=None, help='write full results as JSON')
+    parser.add_argument('--csv', dest='csv_file', default=None, help='write one summary row per run as CSV')
+    args = parser.parse_args()
+
+    results = run_batch(find_event_files(args.paths), args.algorithms, args.jobs, args.timeout,
+                        args.max_tasks_per_child, args.drop_in_flight, args.check_messages, args.codec,
+                        args.convergence)
+
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.csv_file:
+        with open(args.csv_file, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            writer.writeheader()
+            writer.writerows(csv_row(r) for r in results)
+
+    bad = [r for r in results if r["status"] != "pass"]
+    print("%d runs, %d passed, %d failed or broken" % (len(results), len(results) - len(bad), len(bad)))
+    sys.exit(1 if bad else 0)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.ERROR, format=LOGGING_FORMAT, datefmt=LOGGING_DATAFMT)
+    main()
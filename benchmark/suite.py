@@ -0,0 +1,213 @@
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from batch import peak_rss_kb
+from generate_simulation import MODELS, generate_model, generate_simulation
+from sim import Sim
+from simulator.config import OUTPUT_PATH
+from simulator.convergence import Convergence_Tracker
+
+
+# Runs the routing algorithms headless on generated scenarios of growing size and
+# records how fast the simulator goes.  Scenarios come from generate_simulation.py with
+# a fixed seed, so a results file can be compared with one made on another commit.
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+DEFAULT_DEGREES = [3, 5]
+# mean seconds between two link changes, generate_simulation's default and a busier one
+DEFAULT_INTERVALS = [100, 20]
+DEFAULT_ALGORITHMS = ["GENERIC", "DISTANCE_VECTOR", "LINK_STATE"]
+DEFAULT_MODELS = ["nearby"]
+# destinations checked at the end of a run, instead of a DRAW_TREE for every node
+VERIFY_DESTINATIONS = 10
+SCENARIO_PATH = OUTPUT_PATH + 'benchmark/'
+
+
+class Deadline(Exception):
+    pass
+
+
+class Bench_Tracker(Convergence_Tracker):
+    # Notes when the network first goes quiet and stops the run once it is out of time.
+    # The deadline is checked at the end of every time stamp, so a run that times out
+    # still has its counters.
+    def __init__(self, sim, deadline):
+        super().__init__(sim)
+        self.deadline = deadline
+        self.start = time.perf_counter()
+        self.first_convergence = None  # [simulated time, wall time]
+
+    def tick_ended(self, time_stamp):
+        super().tick_ended(time_stamp)
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise Deadline()
+
+    def close(self, converged):
+        super().close(converged)
+        if converged and self.first_convergence is None:
+            self.first_convergence = [self.records[-1]['quiet_at'], time.perf_counter() - self.start]
+
+
+class Bench_Sim(Sim):
+    def __init__(self, algorithm, event_file, timeout):
+        self.timeout = timeout
+        self.timed_out = False
+        super().__init__(algorithm, event_file, 'NO_STOP', render=False)
+
+    def dispatch_event(self, step='NORMAL'):
+        deadline = time.perf_counter() + self.timeout if self.timeout else None
+        self.convergence = Bench_Tracker(self, deadline)
+        try:
+            super().dispatch_event(step)
+        except Deadline:
+            self.timed_out = True
+
+
+def scenario_file(model, size, degree, interval, seed):
+    prefix = SCENARIO_PATH + "%s_n%d_d%d_i%d_s%d" % (model, size, degree, interval, seed)
+    if not os.path.exists(prefix + ".event"):
+        os.makedirs(SCENARIO_PATH, exist_ok=True)
+        if model != "nearby":
+            # the models already end with a VERIFY_SAMPLE
+            generate_model(model, size, degree, 1000, prefix, seed=seed, interval=interval)
+            return prefix + ".event"
+        generate_simulation(size, degree, 1000, prefix, seed=seed, interval=interval)
+        with open(prefix + ".event") as f:
+            lines = f.readlines()
+        draw = [line for line in lines if line.split()[1] == "DRAW_TREE"]
+        with open(prefix + ".event", "w") as f:
+            f.writelines(line for line in lines if line.split()[1] != "DRAW_TREE")
+            if draw:
+                f.write("%s VERIFY_SAMPLE %d\n" % (draw[0].split()[0], VERIFY_DESTINATIONS))
+    return prefix + ".event"
+
+
+def run_one(job):
+    model, size, degree, interval, seed, algorithm, timeout = job
+    result = {
+        "model": model,
+        "size": size,
+        "degree": degree,
+        "interval": interval,
+        "seed": seed,
+        "algorithm": algorithm,
+        "status": "error",
+        "events": None,
+        "events_per_sec": None,
+        "messages": None,
+        "messages_per_sec": None,
+        "first_convergence_time": None,
+        "first_convergence_wall_time": None,
+        "batches_converged": None,
+        "batches": None,
+        "checks_passed": None,
+        "wall_time": None,
+        "peak_rss_kb": None,
+        "error": None,
+    }
+    event_file = scenario_file(model, size, degree, interval, seed)
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            s = Bench_Sim(algorithm, event_file, timeout)
+    except (Exception, SystemExit) as e:
+        result["error"] = "%s: %s" % (type(e).__name__, e)
+        return result
+    wall_time = time.perf_counter() - start
+    events = s.event_queue.Events_Popped
+    result["status"] = "timeout" if s.timed_out else "pass" if all(c["correct"] for c in s.checks) else "fail"
+    result["events"] = events
+    result["events_per_sec"] = events / wall_time
+    result["messages"] = s.message_count
+    result["messages_per_sec"] = s.message_count / wall_time
+    if s.convergence.first_convergence is not None:
+        result["first_convergence_time"], result["first_convergence_wall_time"] = s.convergence.first_convergence
+    result["batches"] = len(s.convergence.records)
+    result["batches_converged"] = sum(1 for r in s.convergence.records if r["converged"])
+    result["checks_passed"] = "%d/%d" % (sum(1 for c in s.checks if c["correct"]), len(s.checks))
+    result["wall_time"] = wall_time
+    result["peak_rss_kb"] = peak_rss_kb()
+    return result
+
+
+def commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def key(result):
+    return (result.get("model", "nearby"), result["size"], result["degree"], result["interval"], result["seed"],
+            result["algorithm"])
+
+
+def compare(old, new):
+    # events/sec of every run found in both files, new over old
+    before = {key(r): r for r in old["results"]}
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None or not o["events_per_sec"] or not r["events_per_sec"]:
+            continue
+        print("%-15s %6d nodes, degree %d, interval %3d, %-16s events/sec %9.0f -> %9.0f (x%.2f)"
+              % (r["model"], r["size"], r["degree"], r["interval"], r["algorithm"],
+                 o["events_per_sec"], r["events_per_sec"], r["events_per_sec"] / o["events_per_sec"]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the routing algorithms on generated topologies.')
+    parser.add_argument('--models', nargs='+', default=DEFAULT_MODELS, choices=['nearby'] + list(MODELS))
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--degrees', type=int, nargs='+', default=DEFAULT_DEGREES)
+    parser.add_argument('--intervals', type=int, nargs='+', default=DEFAULT_INTERVALS,
+                        help='mean seconds between two link changes, lower is more churn')
+    parser.add_argument('--algorithms', nargs='+', default=DEFAULT_ALGORITHMS)
+    parser.add_argument('--seed', type=int, default=340)
+    parser.add_argument('--timeout', type=int, default=600, help='seconds of simulation per run, 0 for none')
+    parser.add_argument('--jobs', type=int, default=1, help='runs at the same time, more than 1 skews the timings')
+    parser.add_argument('--out', default=OUTPUT_PATH + 'benchmark.json')
+    parser.add_argument('--compare', metavar='FILE', default=None, help='earlier results to compare with')
+    args = parser.parse_args()
+
+    jobs = [(model, size, degree, interval, args.seed, algorithm, args.timeout)
+            for model in args.models for size in args.sizes for degree in args.degrees
+            for interval in args.intervals for algorithm in args.algorithms]
+    # generate the scenarios up front, so the runs don't race to write them
+    for model, size, degree, interval, seed in sorted(set(job[:5] for job in jobs)):
+        scenario_file(model, size, degree, interval, seed)
+
+    results = []
+    # a fresh process per run, so peak RSS belongs to that run alone
+    with multiprocessing.Pool(args.jobs, maxtasksperchild=1) as pool:
+        for r in pool.imap(run_one, jobs):
+            results.append(r)
+            print("%-15s %6d nodes, degree %d, interval %3d, %-16s %-7s %9s events/sec %9s messages/sec %8s KB %7.1fs"
+                  % (r["model"], r["size"], r["degree"], r["interval"], r["algorithm"], r["status"],
+                     "%.0f" % r["events_per_sec"] if r["events_per_sec"] else "-",
+                     "%.0f" % r["messages_per_sec"] if r["messages_per_sec"] is not None else "-",
+                     r["peak_rss_kb"] or "-", r["wall_time"] or 0))
+            sys.stdout.flush()
+
+    report = {"commit": commit(), "python": platform.python_version(), "results": results}
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print("results written to %s" % args.out)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
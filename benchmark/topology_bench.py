@@ -0,0 +1,73 @@
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from simulator.node import Node
+from simulator.topology import Topology
+
+
+# Measures the simulator's message data path: send_to_neighbors, the event queue
+# and routing_message_arrival. Nodes do no routing work, so the simulator is all that is timed.
+class Sink_Node(Node):
+    def process_incoming_routing_message(self, m):
+        pass
+
+
+def build(n, degree, seed):
+    random.seed(seed)
+    topo = Topology("GENERIC", 'NO_STOP', render=False)
+    topo.node_cls = Sink_Node
+    for node in range(n):
+        topo.add_node(node)
+    for node in range(n):
+        for _ in range(degree // 2):
+            neighbor = random.randrange(n)
+            if neighbor != node:
+                topo.add_link(node, neighbor, random.randint(1, 10))
+    drain(topo)
+    topo.message_count = 0
+    return topo
+
+
+def drain(topo):
+    e = topo.event_queue.Get_Earliest()
+    while e:
+        e.dispatch()
+        if topo.end_of_tick_nodes and not topo.event_queue.Has_Events_At(e.time_stamp):
+            topo.end_of_tick()
+        e = topo.event_queue.Get_Earliest()
+
+
+def run(n, degree, rounds, seed):
+    topo = build(n, degree, seed)
+    nodes = list(topo.nodes.values())
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for node in nodes:
+            node.send_to_neighbors("m")
+        drain(topo)
+    elapsed = time.perf_counter() - start
+    return topo.message_count, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark messages/sec through the simulator data path.')
+    parser.add_argument('--nodes', type=int, default=5000)
+    parser.add_argument('--degree', type=int, default=6)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=340)
+    args = parser.parse_args()
+
+    messages, elapsed = run(args.nodes, args.degree, args.rounds, args.seed)
+    print("%d nodes, degree ~%d: %d messages in %.2fs, %.0f messages/sec"
+          % (args.nodes, args.degree, messages, elapsed, messages / elapsed))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    main()
@@ -1,11 +1,75 @@
 import json
+from collections import namedtuple
 from simulator.node import Node
+from simulator.codec import register_schema, pack_ints, unpack_ints
+
+
+# What Distance_Vector_Node sends: its whole table as a tuple of (destination, cost, path)
+# entries, each path a tuple of node ids starting with the sender
+Distance_Vector_Message = namedtuple('Distance_Vector_Message', ['sender', 'seq_num', 'routes'])
+
+
+# Binary form, all packed with pack_ints: sender, sequence number, number of routes,
+# then destination, cost, path length and the path of every route
+def pack_message(m):
+    values = [m.sender, m.seq_num, len(m.routes)]
+    for dst, cost, path in m.routes:
+        values += (dst, cost, len(path))
+        values += path
+    return pack_ints(values)
+
+
+def unpack_message(data, offset):
+    values = unpack_ints(data, offset)
+    routes, i = [], 3
+    for _ in range(values[2]):
+        end = i + 3 + values[i + 2]
+        routes.append((values[i], values[i + 1], values[i + 3:end]))
+        i = end
+    return Distance_Vector_Message(values[0], values[1], tuple(routes))
+
+
+register_schema(Distance_Vector_Message, 2, pack_message, unpack_message)
+
+# What Incremental_Distance_Vector_Node sends: the (destination, cost, path) entries that
+# changed since the last update to that neighbor and the destinations withdrawn, or its
+# whole table when full is set.  A Table_Request asks a neighbor for its whole table.
+Incremental_Update = namedtuple('Incremental_Update', ['sender', 'seq_num', 'full', 'routes', 'withdrawn'])
+Table_Request = namedtuple('Table_Request', ['sender'])
+
+
+# Binary form, all packed with pack_ints: sender, sequence number, 1 if full else 0,
+# number of routes, the routes as in Distance_Vector_Message, then the number of
+# withdrawn destinations and the destinations
+def pack_update(m):
+    values = [m.sender, m.seq_num, int(m.full), len(m.routes)]
+    for dst, cost, path in m.routes:
+        values += (dst, cost, len(path))
+        values += path
+    values.append(len(m.withdrawn))
+    values += m.withdrawn
+    return pack_ints(values)
+
+
+def unpack_update(data, offset):
+    values = unpack_ints(data, offset)
+    routes, i = [], 4
+    for _ in range(values[3]):
+        end = i + 3 + values[i + 2]
+        routes.append((values[i], values[i + 1], values[i + 3:end]))
+        i = end
+    return Incremental_Update(values[0], values[1], bool(values[2]), tuple(routes), values[i + 1:i + 1 + values[i]])
+
+
+register_schema(Incremental_Update, 4, pack_update, unpack_update)
+register_schema(Table_Request, 5, lambda m: pack_ints([m.sender]),
+                lambda data, offset: Table_Request(unpack_ints(data, offset)[0]))
 
 # Helper class for storing and managing distance vector information.
 class Distance_Vector:
     def __init__(self, cost: int, path: list):
         self.cost = cost
-        self.path = path if isinstance(path, list) else []
+        self.path = path if isinstance(path, (list, tuple)) else []
 
     def from_str(self, message: str):
         try:
@@ -39,6 +103,9 @@ class Distance_Vector:
 
 
 class Distance_Vector_Node(Node):
+    # Send the distance vectors once at the end of the current time instead of after every change
+    COALESCE = True
+
     def __init__(self, node_id):
         super().__init__(node_id)
         self.my_dvs = {}  
@@ -46,13 +113,10 @@ class Distance_Vector_Node(Node):
         self.neighbor_seq_nums = {}  # Tracks sequence numbers for neighbors
         self.link_costs = {}  
         self.seq_num = 0  # Sequence number for this node's messages
+        self.broadcast_pending = False
 
     def __str__(self):
-        message = {dst: dv.as_dict() for dst, dv in self.my_dvs.items()}  
-        message[-1] = self.seq_num
-        # Increment the sequence number for the next message
-        self.seq_num += 1
-        return json.dumps(message)
+        return json.dumps({dst: dv.as_dict() for dst, dv in self.my_dvs.items()})
 
     def link_has_been_updated(self, neighbor, latency):
         if latency == -1:
@@ -74,6 +138,18 @@ class Distance_Vector_Node(Node):
                 self.recompute_single_dv(src=source, dst=destination, dv=dv)
         # Broadcast the updated distance vectors if any changes were detected
         if self.my_dvs != old_dvs:
+            self.schedule_broadcast()
+
+    def schedule_broadcast(self):
+        if not self.COALESCE:
+            self.broadcast_to_neighbors()
+        elif not self.broadcast_pending:
+            self.broadcast_pending = True
+            self.request_end_of_tick()
+
+    def end_of_tick(self):
+        if self.broadcast_pending:
+            self.broadcast_pending = False
             self.broadcast_to_neighbors()
 
     def recompute_single_dv(self, src: int, dst: int, dv: Distance_Vector):
@@ -86,31 +162,29 @@ class Distance_Vector_Node(Node):
         current_dv = self.my_dvs.get(dst)
         if current_dv is None or new_cost < current_dv.cost:
             # Update the distance vector with a new path
-            new_path = [self.id] + dv.path
+            new_path = [self.id, *dv.path]
             self.my_dvs[dst] = Distance_Vector(cost=new_cost, path=new_path)
 
     def broadcast_to_neighbors(self):
-        message = str(self)
-        self.send_to_neighbors(message)
+        routes = tuple((dst, dv.cost, tuple(dv.path)) for dst, dv in self.my_dvs.items())
+        self.send_to_neighbors(Distance_Vector_Message(self.id, self.seq_num, routes))
+        # Increment the sequence number for the next message
+        self.seq_num += 1
 
     def process_incoming_routing_message(self, m):
-        neighbor_dvs = json.loads(m)
-        seq_num = neighbor_dvs.pop("-1")
+        neighbor, seq_num, routes = m
         changed = False
-        neighbor = int(neighbor_dvs[next(iter(neighbor_dvs))]['path'][0])
         if neighbor not in self.neighbor_dvs:
             self.neighbor_dvs[neighbor] = {}
         # Ignore the message if the sequence number is outdated
         if neighbor in self.neighbor_seq_nums and seq_num <= self.neighbor_seq_nums[neighbor]:
             return
-        to_delete = list(self.neighbor_dvs[neighbor].keys())
+        to_delete = set(self.neighbor_dvs[neighbor])
         # Process each destination in the incoming message
-        for dst_str, value in neighbor_dvs.items():
-            dst = int(dst_str)
+        for dst, cost, path in routes:
             # Remove the destination from the deletion list if it's in the incoming message
-            if dst in to_delete:
-                to_delete.remove(dst)
-            link = Distance_Vector(cost=value['cost'], path=value['path'])
+            to_delete.discard(dst)
+            link = Distance_Vector(cost=cost, path=path)
             # Update the DV table and track changes
             if self.process_neighbor_dv(src=neighbor, dst=dst, dv=link, seq_num=seq_num):
                 changed = True
@@ -138,6 +212,9 @@ class Distance_Vector_Node(Node):
             self.neighbor_dvs[src][dst] = dv
             return True
 
+    def database_size(self):
+        return len(self.my_dvs) + sum(len(dvs) for dvs in self.neighbor_dvs.values())
+
     def get_next_hop(self, destination):
         # Check if the destination is in the current distance vectors
         if destination in self.my_dvs:
@@ -147,3 +224,85 @@ class Distance_Vector_Node(Node):
                 return dv.path[1]
         #no valid next hop
         return -1
+
+
+# Distance vector that only sends each neighbor the entries that changed since the last
+# advertisement to that neighbor.  A neighbor that has just come up gets the whole table.
+# Updates to a neighbor are numbered; one that arrives out of order (a latency change
+# can reorder a link) is dropped, and the receiver asks for the whole table again.
+class Incremental_Distance_Vector_Node(Distance_Vector_Node):
+    def __init__(self, node_id):
+        super().__init__(node_id)
+        self.advertised = {}  # neighbor -> {destination: (cost, path)} last sent to it
+        self.sent_seq_nums = {}  # neighbor -> number of the last update sent to it
+        self.pending_full = set()  # neighbors that get the whole table next
+
+    def link_has_been_updated(self, neighbor, latency):
+        if latency == -1:
+            self.advertised.pop(neighbor, None)
+            self.pending_full.discard(neighbor)
+            self.neighbor_seq_nums.pop(neighbor, None)
+        elif neighbor not in self.link_costs:
+            self.pending_full.add(neighbor)
+            # nothing from this neighbor counts until its whole table arrives
+            self.neighbor_seq_nums[neighbor] = None
+        super().link_has_been_updated(neighbor, latency)
+        # a new neighbor needs our table even if the link did not change it
+        if self.pending_full:
+            self.schedule_broadcast()
+
+    def broadcast_to_neighbors(self):
+        current = {dst: (dv.cost, dv.path) for dst, dv in self.my_dvs.items()}
+        for neighbor in self.link_costs:
+            if neighbor in self.pending_full:
+                self.send_full(neighbor)
+                continue
+            old = self.advertised.get(neighbor, {})
+            changed = tuple((dst, cost, tuple(path)) for dst, (cost, path) in current.items() if old.get(dst) != (cost, path))
+            withdrawn = tuple(dst for dst in old if dst not in current)
+            if changed or withdrawn:
+                self.send_update(neighbor, False, changed, withdrawn)
+                self.advertised[neighbor] = current
+
+    def send_full(self, neighbor):
+        self.pending_full.discard(neighbor)
+        self.advertised[neighbor] = {dst: (dv.cost, dv.path) for dst, dv in self.my_dvs.items()}
+        self.send_update(neighbor, True, tuple((dst, dv.cost, tuple(dv.path)) for dst, dv in self.my_dvs.items()), ())
+
+    def send_update(self, neighbor, full, routes, withdrawn):
+        seq_num = self.sent_seq_nums.get(neighbor, 0) + 1
+        self.sent_seq_nums[neighbor] = seq_num
+        self.send_to_neighbor(neighbor, Incremental_Update(self.id, seq_num, full, routes, withdrawn))
+
+    def process_incoming_routing_message(self, m):
+        neighbor = m.sender
+        if neighbor not in self.link_costs:
+            return  # sent over a link that is gone
+        if isinstance(m, Table_Request):
+            self.send_full(neighbor)
+            return
+
+        seq_num, last = m.seq_num, self.neighbor_seq_nums.get(neighbor)
+        if m.full:
+            if last is not None and seq_num <= last:
+                return
+            self.neighbor_dvs[neighbor] = {}
+        elif last is None or seq_num <= last:
+            return  # waiting for a whole table, or an old update
+        elif seq_num != last + 1:
+            # an earlier update is still on its way, start over from a whole table
+            self.neighbor_seq_nums[neighbor] = None
+            self.send_to_neighbor(neighbor, Table_Request(self.id))
+            return
+        self.neighbor_seq_nums[neighbor] = seq_num
+
+        dvs = self.neighbor_dvs.setdefault(neighbor, {})
+        for dst in m.withdrawn:
+            dvs.pop(dst, None)
+        for dst, cost, path in m.routes:
+            dv = Distance_Vector(cost=cost, path=path)
+            if self.id in dv.path:
+                dvs.pop(dst, None)  # loop prevention, as in process_neighbor_dv
+            else:
+                dvs[dst] = dv
+        self.recompute_dvs()
@@ -1,44 +1,138 @@
 import argparse
+import collections
 import datetime
+import heapq
 import math
 import random
 
 
 MAX_LATENCY = 10
+# mean number of seconds between two link changes
+CHANGE_INTERVAL = 10 * MAX_LATENCY
 
 
 def random_weight():
     return random.randint(1, MAX_LATENCY)
 
 
-def del_node(links, removed, file, link_time, node, time):
+def edge_key(a, b):
+    return (a, b) if a < b else (b, a)
+
+
+class Edge_Pool:
+    # The live links, in the order they were added.  random.choice picks a link by its
+    # position, so the order is what keeps the file of a seed the same.  Removed links
+    # leave a hole in the slots, and a Fenwick tree over the holes finds the k-th live
+    # link in O(log n).  Links are also indexed by their end points, for duplicate checks
+    # and removal, and by node.
+    def __init__(self):
+        self.slots = []  # link, or None once removed
+        self.tree = [0]  # Fenwick tree of live slots, 1-indexed
+        self.count = 0
+        self.index = {}  # (smaller end, larger end) -> slot
+        self.incident = collections.defaultdict(set)  # node -> slots of its links
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return (link for link in self.slots if link is not None)
+
+    def __getitem__(self, k):
+        # the k-th live link, k starting at 0
+        if not 0 <= k < self.count:
+            raise IndexError(k)
+        tree = self.tree
+        pos = 0
+        step = 1 << (len(tree) - 1).bit_length()
+        while step:
+            if pos + step < len(tree) and tree[pos + step] <= k:
+                pos += step
+                k -= tree[pos]
+            step >>= 1
+        return self.slots[pos]
+
+    def has(self, a, b):
+        return edge_key(a, b) in self.index
+
+    def append(self, link):
+        slot = len(self.slots)
+        if slot + 1 >= len(self.tree):
+            self.grow()
+        self.slots.append(link)
+        self.index[edge_key(link[0], link[1])] = slot
+        self.incident[link[0]].add(slot)
+        self.incident[link[1]].add(slot)
+        self.update(slot + 1, 1)
+        self.count += 1
+
+    def remove(self, link):
+        self.remove_slot(self.index[edge_key(link[0], link[1])])
+
+    def remove_node(self, node):
+        for slot in sorted(self.incident[node]):
+            self.remove_slot(slot)
+
+    def remove_slot(self, slot):
+        link = self.slots[slot]
+        self.slots[slot] = None
+        del self.index[edge_key(link[0], link[1])]
+        self.incident[link[0]].discard(slot)
+        self.incident[link[1]].discard(slot)
+        self.update(slot + 1, -1)
+        self.count -= 1
+
+    def links_of(self, node):
+        # in link order, like a scan of the list would find them
+        return [self.slots[slot] for slot in sorted(self.incident[node])]
+
+    def neighbors(self, node):
+        return [link[1] if link[0] == node else link[0] for link in self.links_of(node)]
+
+    def update(self, i, delta):
+        tree = self.tree
+        size = len(tree)
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def grow(self):
+        # double the tree and rebuild it from the slots in O(n)
+        size = 2 * len(self.tree)
+        tree = [0] * size
+        for i, link in enumerate(self.slots, 1):
+            if i < size and link is not None:
+                tree[i] += 1
+        for i in range(1, size):
+            parent = i + (i & -i)
+            if parent < size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+
+def del_node(links, removed, file, link_time, node, time, interval=CHANGE_INTERVAL):
     change = random.randint(0, 100)
     if change <= 5:
         for t in range(link_time + 1, time):
             # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
+            # we want the time between events to be roughly interval
+            if 0 == random.randint(0, interval):
                 if len(links) > 0:
-                    removed.append(node)
+                    removed.add(node)
                     file.write("{} DELETE_NODE {}\n".format(link_time + 1, node))
-                    temp = []
-                    for l in links:
-                        if not (l[0] == node or l[1] == node):
-                            temp.append(l)
-                    links.clear()
-                    links.extend(temp)
+                    links.remove_node(node)
                     return -1, t + 1
                 break
     return 1, link_time
 
 
-def del_link(links, file, link_time, time):
+def del_link(links, file, link_time, time, interval=CHANGE_INTERVAL):
     change = random.randint(0, 100)
     if change <= 10:
         for t in range(link_time + 1, time):
             # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
+            # we want the time between events to be roughly interval
+            if 0 == random.randint(0, interval):
                 if len(links) > 0:
                     link_rem = random.choice(links)
                     links.remove(link_rem)
@@ -95,16 +189,13 @@ def add_link(n, src, removed, links, link_time, file):
             val = random.randint(max(0, src - offset), min(n - 1, src + offset))
             if val not in removed:
                 neighbor = val
-        if src in removed:
-            stop = 0
         link = (src, neighbor, random_weight())
-        already_exists = any([(l[0] == src and l[1] == neighbor) or (l[0] == neighbor and l[1] == src) for l in links])
-        if already_exists or src == neighbor:
+        if links.has(src, neighbor) or src == neighbor:
             count += 1
             if count >= timeout:
                 return link_time
             continue
-        links.extend([link])
+        links.append(link)
         file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
         link_time += 1
         break
@@ -112,27 +203,53 @@ def add_link(n, src, removed, links, link_time, file):
 
 
 def bfs(links, islands, nodes):
-    while len(nodes) > 0:
-        curr = next(iter(nodes))
-        queue = [curr]
-        island = set([])
+    # Each island is a set filled in breadth first order, neighbors in link order, and
+    # islands is a set of those as tuples.  Set iteration order depends on insertion order,
+    # and the first node of each island ends up in the file, so keep both orders.
+    visited = set()
+    for start in list(nodes):
+        if start in visited:
+            continue
+        visited.add(start)
+        island = set([start])
+        queue = collections.deque([start])
         while len(queue) > 0:
-            curr = queue.pop(0)
-            island.add(curr)
-            if curr in nodes:
-                nodes.remove(curr)
-                for i in links:
-                    if curr == i[0]:
-                        queue.append(i[1])
-                    elif curr == i[1]:
-                        queue.append(i[0])
+            curr = queue.popleft()
+            for neighbor in links.neighbors(curr):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    island.add(neighbor)
+                    queue.append(neighbor)
         islands.add(tuple(island))
     return islands
 
 
 
 
-def generate_simulation(n, degree, time, filename):
+def assign_areas(nodes, links, areas):
+    # grow the areas breadth first from evenly spaced seeds over the final links,
+    # so that every area is connected
+    neighbors = {node: [] for node in nodes}
+    for l in links:
+        if l[0] in neighbors and l[1] in neighbors:
+            neighbors[l[0]].append(l[1])
+            neighbors[l[1]].append(l[0])
+    order = sorted(nodes)
+    seeds = [order[i * len(order) // areas] for i in range(areas)]
+    area = {seed: a for a, seed in enumerate(seeds)}
+    queue = collections.deque(seeds)
+    while len(queue) > 0:
+        curr = queue.popleft()
+        for neighbor in neighbors[curr]:
+            if neighbor not in area:
+                area[neighbor] = area[curr]
+                queue.append(neighbor)
+    return {node: area.get(node, 0) for node in order}
+
+
+def generate_simulation(n, degree, time, filename, areas=1, seed=None, interval=CHANGE_INTERVAL):
+    if seed is not None:
+        random.seed(seed)
     n *= 1.5
     n = int(n)
     nxt = n + 1
@@ -140,12 +257,13 @@ def generate_simulation(n, degree, time, filename):
     if degree > math.log(n,2)-1:
         raise Exception("Degree must be smaller than log(n) where n is the number of nodes.")
 
-    links = []
-    removed = []
+    links = Edge_Pool()
+    removed = set()
+    created = {}  # node -> time it was added, for nodes added after time 0
 
     print("writing %s.event" % filename)
     link_time = 1
-    with open("%s.event" % filename, "w") as file:
+    with open("%s.event" % filename, "w", buffering=1 << 20) as file:
         # create nodes
         for i in range(n):
             file.write("0 ADD_NODE %d\n" % i)
@@ -153,7 +271,7 @@ def generate_simulation(n, degree, time, filename):
         for i in range(n):
             # don't make links truly random, favor nodes with nearby indexes
 
-            res, link_time = del_node(links, removed, file, link_time, i, time)
+            res, link_time = del_node(links, removed, file, link_time, i, time, interval)
             if res == -1:
                 continue
 
@@ -164,8 +282,7 @@ def generate_simulation(n, degree, time, filename):
                 offset = int(offset)
                 for neighbor in [i+offset, i-offset]:
                     if neighbor >= 0 and neighbor < n and neighbor not in removed:
-                        already_exists = any([(l[0] == i and l[1] == neighbor) or (l[0] == neighbor and l[1] == i) for l in links])
-                        if not already_exists:
+                        if not links.has(i, neighbor):
                             possible_neighbors.append(neighbor)
             # choose random links
             for j in range(min(degree, len(possible_neighbors))):
@@ -177,18 +294,15 @@ def generate_simulation(n, degree, time, filename):
 
                 # i = change_node(n, i, file, links)
 
-                link_time = del_link(links, file, link_time, time)
-
-                if i in removed or neighbor in removed:
-                    stop = 0
+                link_time = del_link(links, file, link_time, time, interval)
 
                 link = (i, neighbor, random_weight())
-                links.extend([link])
+                links.append(link)
                 file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
                 link_time += 1
                 # above, we actually create links at different times just in case they are duplicated
 
-                res, link_time = del_node(links, removed, file, link_time, i, time)
+                res, link_time = del_node(links, removed, file, link_time, i, time, interval)
                 if res == -1:
                     break
 
@@ -199,21 +313,24 @@ def generate_simulation(n, degree, time, filename):
         # file.write("%d DRAW_TOPOLOGY\n" % link_time);
         for t in range(link_time+1, time):
             # link change events are a poisson process.
-            # we want the time between events to be roughly 10 * MAX_LATENCY
-            if 0 == random.randint(0, 10 * MAX_LATENCY):
+            # we want the time between events to be roughly interval
+            if 0 == random.randint(0, interval):
                 link_to_change = random.choice(links)
                 links.remove(link_to_change)
                 val = random_weight()
                 file.write("%d CHANGE_LINK %d %d %d\n" %
                            (t, link_to_change[0], link_to_change[1], val))
                 link = (link_to_change[0], link_to_change[1], val)
-                links.extend([link])
+                links.append(link)
 
+                added = nxt
                 nxt = add_node(removed, t, file, nxt)
+                if nxt != added:
+                    created[added] = t
                 add_link(n, link_to_change[0], removed, links, t, file)
                 # change_node(n, link_to_change[1], file, links)
-                del_link(links, file, t, time)
-                del_node(links, removed, file, t, link_to_change[0], time)
+                del_link(links, file, t, time, interval)
+                del_node(links, removed, file, t, link_to_change[0], time, interval)
 
             link_time = t + 1
 
@@ -229,17 +346,271 @@ def generate_simulation(n, degree, time, filename):
             second = ind[0]
             link = (first, second, random_weight())
             file.write("%d ADD_LINK %d %d %d\n" % ((link_time,) + link))
+            links.append(link)
             # link_time += 20
             first = second
         # CODE TO ENSURE GRAPH IS CONNECTED
 
         # file.write("%d DRAW_TOPOLOGY\n" % (link_time + 1000))
 
+        if areas > 1:
+            # a node only joins its area once it exists; nodes that are never added
+            # come into being with their first link at link_time
+            alive = set([x for x in range(nxt) if x not in removed])
+            for node, area in assign_areas(alive, links, areas).items():
+                when = 0 if node < n else created.get(node, link_time)
+                file.write("%d SET_AREA %d %d\n" % (when, node, area))
+
         # print routing results
         for i in set([x for x in range(nxt) if x not in removed]):
             file.write("%d DRAW_TREE %d\n" % (10*time, i))
 
 
+# Topology models for --model.  Each returns the number of nodes, numbered from 0, and
+# the links as (node, node, latency) tuples.  They draw from the global random, so
+# --seed fixes them too.  'nearby' is generate_simulation above.
+def barabasi_albert(n, degree):
+    # preferential attachment: every new node links to `degree` nodes picked with a
+    # probability proportional to their degree, which grows a few large hubs
+    m = max(1, degree)
+    links = [(a, b, random_weight()) for a in range(m + 1) for b in range(a + 1, m + 1)]
+    targets = [node for link in links for node in link[:2]]  # a node once per link end
+    for node in range(m + 1, n):
+        chosen = []
+        while len(chosen) < m:
+            target = random.choice(targets)
+            if target not in chosen:
+                chosen.append(target)
+        for target in chosen:
+            links.append((node, target, random_weight()))
+        targets.extend(chosen)
+        targets.extend([node] * m)
+    return max(n, m + 1), links
+
+
+# Waxman links two nodes at distance d with probability WAXMAN_BETA * exp(-d / (alpha * L)).
+# Pairs further apart than WAXMAN_CUTOFF * alpha * L are not tried (under 1% of the
+# links), so each node is only compared with the nodes of the grid cells around it.
+WAXMAN_BETA = 0.5
+WAXMAN_CUTOFF = 7
+
+
+def waxman(n, degree):
+    points = [(random.random(), random.random()) for _ in range(n)]
+    # alpha * L for a mean degree of about `degree`, ignoring the borders of the square
+    scale = math.sqrt(degree / (2 * math.pi * n * WAXMAN_BETA))
+    cutoff = WAXMAN_CUTOFF * scale
+    cells = collections.defaultdict(list)
+    for node, (x, y) in enumerate(points):
+        cells[(int(x / cutoff), int(y / cutoff))].append(node)
+
+    def latency(a, b):
+        # geometric: one unit of latency per alpha * L of distance
+        d = math.hypot(points[a][0] - points[b][0], points[a][1] - points[b][1])
+        return min(MAX_LATENCY, 1 + int(d / scale))
+
+    links = []
+    for node, (x, y) in enumerate(points):
+        cx, cy = int(x / cutoff), int(y / cutoff)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for other in cells.get((cx + dx, cy + dy), ()):
+                    if other <= node:
+                        continue
+                    d = math.hypot(x - points[other][0], y - points[other][1])
+                    if d < cutoff and random.random() < WAXMAN_BETA * math.exp(-d / scale):
+                        links.append((node, other, latency(node, other)))
+    # union-find over the links, then one link from each component to the next
+    parent = list(range(n))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+    for a, b, _ in links:
+        parent[find(a)] = find(b)
+    roots = sorted(set(find(node) for node in range(n)))
+    for a, b in zip(roots, roots[1:]):
+        links.append((a, b, latency(a, b)))
+    return n, links
+
+
+def grid(n, degree, wrap=False):
+    # rows x cols nodes, as close to a square as n allows; degree is not used
+    rows = max(1, math.isqrt(n))
+    cols = max(1, n // rows)
+    links = []
+    for r in range(rows):
+        for c in range(cols):
+            node = r * cols + c
+            if c + 1 < cols:
+                links.append((node, node + 1, random_weight()))
+            elif wrap and cols > 2:
+                links.append((node, r * cols, random_weight()))
+            if r + 1 < rows:
+                links.append((node, node + cols, random_weight()))
+            elif wrap and rows > 2:
+                links.append((node, c, random_weight()))
+    return rows * cols, links
+
+
+def torus(n, degree):
+    return grid(n, degree, wrap=True)
+
+
+def fat_tree(n, degree):
+    # k-ary fat tree, a three tier Clos network: k pods of k/2 aggregation and k/2 edge
+    # switches, (k/2)^2 core switches and k/2 hosts under every edge switch, with the
+    # smallest even k that gives n nodes.  Every link has latency 1, so hosts in different
+    # pods have (k/2)^2 equal cost paths.  degree is not used.
+    k = 2
+    while 5 * k * k // 4 + k ** 3 // 4 < n:
+        k += 2
+    half = k // 2
+    links = []
+    node = half * half  # the core switches come first
+    for pod in range(k):
+        aggregation = range(node, node + half)
+        edge = range(node + half, node + k)
+        node += k
+        for i, switch in enumerate(aggregation):
+            # aggregation switch i of every pod goes to core switches i * k/2 .. i * k/2 + k/2 - 1
+            for j in range(half):
+                links.append((switch, i * half + j, 1))
+            for down in edge:
+                links.append((switch, down, 1))
+        for switch in edge:
+            for _ in range(half):
+                links.append((switch, node, 1))
+                node += 1
+    return node, links
+
+
+def ring_of_cliques(n, degree):
+    # cliques of degree + 1 nodes, each joined to the next by one link: dense locally,
+    # with a diameter that grows with the number of cliques
+    size = max(2, degree + 1)
+    count = max(3, n // size)
+    links = []
+    for c in range(count):
+        first = c * size
+        for a in range(first, first + size):
+            for b in range(a + 1, first + size):
+                links.append((a, b, random_weight()))
+        links.append((first + size - 1, (c + 1) % count * size, random_weight()))
+    return count * size, links
+
+
+MODELS = {
+    'ba': barabasi_albert,
+    'waxman': waxman,
+    'grid': grid,
+    'torus': torus,
+    'fat_tree': fat_tree,
+    'ring_of_cliques': ring_of_cliques,
+}
+
+# a failed link comes back after 1 to DOWN_TIME seconds
+DOWN_TIME = 5 * MAX_LATENCY
+# nodes whose links go down together in a correlated failure
+CORRELATED_SIZE = 8
+# destinations checked at the end of a model's file
+VERIFY_DESTINATIONS = 10
+
+
+def poisson_times(start, end, interval):
+    # arrival times of a poisson process with a mean of interval seconds, 0 for none
+    times = []
+    t = start
+    while interval > 0:
+        t += max(1, int(round(random.expovariate(1.0 / interval))))
+        if t >= end:
+            break
+        times.append(t)
+    return times
+
+
+def write_churn(file, links, count, start, end, interval, failures, correlated, correlated_size, down_time):
+    # Three independent processes between start and end:
+    #   link flaps: a random link goes down and comes back up to down_time later,
+    #   node failures: a random node is deleted for good (node ids are not reused),
+    #   correlated failures: every link of a random node and its nearest correlated_size - 1
+    #   neighbors goes down at once, as when a site loses power, and comes back together.
+    events = sorted([(t, 0) for t in poisson_times(start, end, interval)] +
+                    [(t, 1) for t in poisson_times(start, end, failures)] +
+                    [(t, 2) for t in poisson_times(start, end, correlated)])
+    alive = list(range(count))
+    position = {node: i for i, node in enumerate(alive)}
+    dead = set()
+    restores = []  # heap of (time it comes back, link)
+
+    def kill(node):
+        # swap with the last node, O(1)
+        i = position.pop(node)
+        last = alive.pop()
+        if last != node:
+            alive[i] = last
+            position[last] = i
+        dead.add(node)
+
+    def take_down(t, link, up):
+        links.remove(link)
+        file.write("%d DELETE_LINK %d %d\n" % (t, link[0], link[1]))
+        heapq.heappush(restores, (up, link))
+
+    def restore_until(t):
+        while len(restores) > 0 and restores[0][0] <= t:
+            up, link = heapq.heappop(restores)
+            if link[0] not in dead and link[1] not in dead and not links.has(link[0], link[1]):
+                links.append(link)
+                file.write("%d ADD_LINK %d %d %d\n" % ((up,) + link))
+
+    for t, kind in events:
+        restore_until(t)
+        if kind == 0 and len(links) > 0:
+            take_down(t, random.choice(links), t + random.randint(1, down_time))
+        elif kind == 1 and len(alive) > 2:
+            node = random.choice(alive)
+            kill(node)
+            links.remove_node(node)
+            file.write("%d DELETE_NODE %d\n" % (t, node))
+        elif kind == 2 and len(alive) > 0:
+            # breadth first from a random node over the links that are up
+            site = [random.choice(alive)]
+            seen = set(site)
+            for node in site:
+                for neighbor in links.neighbors(node):
+                    if len(site) < correlated_size and neighbor not in seen:
+                        seen.add(neighbor)
+                        site.append(neighbor)
+            up = t + random.randint(1, down_time)
+            for node in site:
+                for link in links.links_of(node):
+                    take_down(t, link, up)
+    restore_until(float('inf'))
+
+
+def generate_model(model, n, degree, time, filename, seed=None, interval=CHANGE_INTERVAL, failures=0,
+                   correlated=0, correlated_size=CORRELATED_SIZE, down_time=DOWN_TIME):
+    # All links come up at time 1, the churn runs from time to 2 * time, and the routes to
+    # a sample of destinations are checked at 10 * time.
+    if seed is not None:
+        random.seed(seed)
+    count, topology = MODELS[model](n, degree)
+    print("writing %s.event" % filename)
+    with open("%s.event" % filename, "w", buffering=1 << 20) as file:
+        for node in range(count):
+            file.write("0 ADD_NODE %d\n" % node)
+        links = Edge_Pool()
+        for link in topology:
+            links.append(link)
+            file.write("1 ADD_LINK %d %d %d\n" % link)
+        write_churn(file, links, count, time, 2 * time, interval, failures, correlated, correlated_size, down_time)
+        file.write("%d VERIFY_SAMPLE %d\n" % (10 * time, VERIFY_DESTINATIONS))
+
+
+
 if __name__ == "__main__":
     current_time = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S-%f')
     parser = argparse.ArgumentParser(
@@ -252,6 +623,35 @@ if __name__ == "__main__":
                         default=1000, help='time, in seconds, to run the simulation')
     parser.add_argument('--out', dest='filename', action='store',
                         default=current_time, help='output filename prefix')
+    parser.add_argument('--areas', dest='areas', action='store',
+                        default=1, help='split the nodes into this many connected areas (SET_AREA)')
+    parser.add_argument('--seed', dest='seed', action='store', type=int,
+                        default=None, help='seed of the random generator, for a reproducible file')
+    parser.add_argument('--interval', dest='interval', action='store', type=int,
+                        default=CHANGE_INTERVAL, help='mean number of seconds between two link changes (link flaps)')
+    parser.add_argument('--model', dest='model', action='store', choices=['nearby'] + list(MODELS),
+                        default='nearby', help='topology model, nearby is the original generator')
+    parser.add_argument('--failures', dest='failures', action='store', type=int,
+                        default=0, help='mean number of seconds between two node failures, 0 for none (models)')
+    parser.add_argument('--correlated', dest='correlated', action='store', type=int,
+                        default=0, help='mean number of seconds between two correlated failures, 0 for none (models)')
+    parser.add_argument('--correlated-size', dest='correlated_size', action='store', type=int,
+                        default=CORRELATED_SIZE, help='nodes whose links fail together in a correlated failure (models)')
+    parser.add_argument('--down-time', dest='down_time', action='store', type=int,
+                        default=DOWN_TIME, help='longest time a failed link stays down (models)')
     args = parser.parse_args()
-    generate_simulation(n=int(args.n), degree=int(args.degree), time=int(args.time),
-                        filename=args.filename)
+    if args.model == 'nearby':
+        # the churn of the nearby generator is its own, only --interval applies to it
+        for name, value, default in (('--failures', args.failures, 0), ('--correlated', args.correlated, 0),
+                                     ('--correlated-size', args.correlated_size, CORRELATED_SIZE),
+                                     ('--down-time', args.down_time, DOWN_TIME)):
+            if value != default:
+                parser.error("%s needs a --model other than nearby" % name)
+        generate_simulation(n=int(args.n), degree=int(args.degree), time=int(args.time),
+                            filename=args.filename, areas=int(args.areas), seed=args.seed, interval=args.interval)
+    else:
+        if int(args.areas) != 1:
+            parser.error("--areas only works with --model nearby")
+        generate_model(args.model, n=int(args.n), degree=int(args.degree), time=int(args.time),
+                       filename=args.filename, seed=args.seed, interval=args.interval, failures=args.failures,
+                       correlated=args.correlated, correlated_size=args.correlated_size, down_time=args.down_time)
@@ -1,14 +1,49 @@
 from simulator.node import Node
-import json
-import heapq
+from simulator.shortest_path_tree import Shortest_Path_Tree
+from simulator.codec import register_schema, pack_ints, unpack_ints
+from collections import namedtuple
+
+
+# One link as flooded by Link_State_Node, cost inf for a deleted link.  A message is a
+# Link_State_Update with one record, or all records of a time when they are sent together.
+Link_Record = namedtuple('Link_Record', ['src', 'dst', 'cost', 'seq_num'])
+Link_State_Update = namedtuple('Link_State_Update', ['records'])
+
+
+# Binary form: the number of records, then src, dst, cost (-1 for inf) and sequence
+# number of every record, all packed with pack_ints
+def pack_update(m):
+    values = [len(m.records)]
+    for src, dst, cost, seq_num in m.records:
+        values += (src, dst, -1 if cost == float('inf') else cost, seq_num)
+    return pack_ints(values)
+
+
+def unpack_update(data, offset):
+    values = iter(unpack_ints(data, offset)[1:])
+    return Link_State_Update(tuple(Link_Record(src, dst, float('inf') if cost == -1 else cost, seq_num)
+                                   for src, dst, cost, seq_num in zip(values, values, values, values)))
+
+
+register_schema(Link_State_Update, 1, pack_update, unpack_update)
 
 
 class Link_State_Node(Node):
+    # Repair the shortest path tree in place when a link changes instead of rebuilding it
+    INCREMENTAL_SPF = True
+    # Compare every repaired tree against a full SPF, for testing
+    CHECK_SPF = False
+    # Flood the link records of the current time together, in one message, at its end
+    COALESCE = True
+
     def __init__(self, id):
         super().__init__(id)
         self.dataBase = {}
         self.sequenceNumbers = {}
         self.neighbors = {}
+        self.adjacency = {} # undirected view of dataBase: node -> {neighbor: cheapest cost}
+        self.routes = None # shortest path tree over adjacency, built on the first query
+        self.pendingLinks = {} # (src, dst) -> latest record to flood at the end of the current time
 
     # Return a string
     def __str__(self):
@@ -33,20 +68,12 @@ class Link_State_Node(Node):
         sequenceNumber = self.sequenceNumbers.get((self.id, neighbor), 0)
         newSequenceNumber = sequenceNumber +  1
         self.sequenceNumbers[(self.id, neighbor)] = newSequenceNumber
-        self.dataBase[(self.id, neighbor)] = latency #update in the database
-        link_dict = { #dictionary
-            'src' : self.id,
-            'dst' : neighbor,
-            'cost' : latency,
-            'seq_num' : newSequenceNumber
-        }
-        self.floodToState(link_dict) #flood to other links
+        self.setLink(self.id, neighbor, latency) #update in the database
+        self.floodToState(Link_Record(self.id, neighbor, latency, newSequenceNumber)) #flood to other links
         if latency == float('inf'): # handle the infinity
-            updateDatabase = {}
-            for (source, destination), cost in self.dataBase.items():
-                if source != neighbor and destination != neighbor:
-                    updateDatabase[(source, destination)] = cost
-            self.dataBase = updateDatabase
+            for (source, destination) in list(self.dataBase):
+                if source == neighbor or destination == neighbor:
+                    self.removeLink(source, destination)
             updateSequenceNumbers = {}
 
             for (source, destination), sequenceNumber in self.sequenceNumbers.items():
@@ -61,68 +88,92 @@ class Link_State_Node(Node):
 
     # Fill in this function
     def process_incoming_routing_message(self, m):
-        message = json.loads(m)
-        source = message['src']
-        destination  = message['dst']
-        cost = message['cost']
-        sequenceNumber = message['seq_num']
+        for record in m.records:
+            self.processLink(record)
+
+    def processLink(self, message):
+        source, destination, cost, sequenceNumber = message
 
         if (source, destination) not in self.sequenceNumbers or sequenceNumber > self.sequenceNumbers[(source, destination)]:
             if cost == float('inf'):
                 if (source, destination) in self.dataBase:
-                    del self.dataBase[(source, destination)]
+                    self.removeLink(source, destination)
             else:
-                self.dataBase[(source, destination)] = cost
+                self.setLink(source, destination, cost)
             self.sequenceNumbers[(source, destination)] = sequenceNumber
             self.floodToState(message)
     
-    def floodToState(self, link_dict):
-        message = json.dumps(link_dict)
-        self.send_to_neighbors(message)
+    def floodToState(self, record):
+        if not self.COALESCE:
+            self.send_to_neighbors(Link_State_Update((record,)))
+            return
+        self.pendingLinks[(record.src, record.dst)] = record
+        self.request_end_of_tick()
+
+    def end_of_tick(self):
+        if self.pendingLinks:
+            message = Link_State_Update(tuple(self.pendingLinks.values()))
+            self.pendingLinks = {}
+            self.send_to_neighbors(message)
 
     def refloodToLinks(self):
         for (source, destination), cost in self.dataBase.items():
             sequenceNumber = self.sequenceNumbers.get((source, destination), 0)
-            link_dict = {
-                'src': source,
-                'dst': destination,
-                'cost': cost,
-                'seq_num': sequenceNumber
-            }
-            self.floodToState(link_dict)
+            self.floodToState(Link_Record(source, destination, cost, sequenceNumber))
+
+
+    def setLink(self, source, destination, cost):
+        self.dataBase[(source, destination)] = cost
+        self.updateAdjacency(source, destination)
 
+    def removeLink(self, source, destination):
+        del self.dataBase[(source, destination)]
+        self.updateAdjacency(source, destination)
+
+    def pairCost(self, a, b):
+        # a link is usable in both directions at the cheaper of the two advertised costs
+        costs = [self.dataBase[link] for link in ((a, b), (b, a)) if link in self.dataBase]
+        return min(costs) if costs else None
+
+    def updateAdjacency(self, a, b):
+        old = self.adjacency.get(a, {}).get(b)
+        new = self.pairCost(a, b)
+        if new is not None:
+            self.adjacency.setdefault(a, {})[b] = new
+            self.adjacency.setdefault(b, {})[a] = new
+        else:
+            # nodes stay in adjacency once known, the tree may still refer to them
+            self.adjacency.get(a, {}).pop(b, None)
+            self.adjacency.get(b, {}).pop(a, None)
+
+        if self.routes is None or new == old:
+            return
+        if not self.INCREMENTAL_SPF:
+            self.routes = None
+            return
+        self.routes.update_link(a, b, old, new)
+        if self.CHECK_SPF:
+            self.checkRoutes()
+
+    def checkRoutes(self):
+        full = Shortest_Path_Tree(self.adjacency, self.id)
+        if full.dist != self.routes.dist:
+            raise AssertionError("Node %d: incremental SPF distances differ from full SPF" % self.id)
+        for node, parent in self.routes.pred.items():
+            if parent is not None and self.routes.dist[node] != self.routes.dist[parent] + self.adjacency[parent][node]:
+                raise AssertionError("Node %d: incremental SPF has a broken tree link %s -> %s" % (self.id, parent, node))
+
+    def routingTree(self):
+        if self.id not in self.adjacency:
+            return None
+        if self.routes is None:
+            self.routes = Shortest_Path_Tree(self.adjacency, self.id)
+        return self.routes
 
     def get_next_hop(self, destination):
-        visited = set()
-        distances = {self.id : 0}
-        previousNodes = {self.id : None}
-        pq = [(0, self.id)] #heap
-        while pq: #iterate until the heap is null
-            currentDistance, currentNode = heapq.heappop(pq)
-
-            if currentNode == destination:
-                while previousNodes[currentNode] != self.id:
-                    currentNode = previousNodes[currentNode]
-                return currentNode
-            
-            visited.add(currentNode)#mark visited
-            
-            for (source, dst), cost in self.dataBase.items():
-                if source == currentNode:
-                    neighbor = dst
-                elif dst == currentNode:
-                    neighbor = source
-                else:
-                    continue
-
-                if neighbor in visited:
-                    continue
-
-                updateDistance = currentDistance + cost
-
-                if neighbor not in distances or updateDistance < distances[neighbor]:
-                    distances[neighbor] = updateDistance
-                    previousNodes[neighbor] = currentNode
-                    heapq.heappush(pq, (updateDistance, neighbor) )
-
-        return -1
\ No newline at end of file
+        tree = self.routingTree()
+        hop = tree.get_first_hop(destination) if tree is not None else None
+        return -1 if hop is None else hop
+
+    def database_size(self):
+        return len(self.dataBase)
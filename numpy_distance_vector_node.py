@@ -0,0 +1,198 @@
+import json
+from collections import namedtuple
+
+import numpy as np
+
+from simulator.codec import register_schema, pack_ints, unpack_ints
+from simulator.node import Node
+
+
+# What Numpy_Distance_Vector_Node sends: its whole table as the raw bytes of two arrays,
+# the costs (float64, inf for unreachable) and the path matrix (int32, one row per
+# destination padded with -1).  Every receiver gets the same message and reads the
+# arrays in place with np.frombuffer.
+Numpy_Distance_Vector_Message = namedtuple('Numpy_Distance_Vector_Message', ['sender', 'seq_num', 'costs', 'paths'])
+PATH_TYPE = np.dtype('<i4')
+
+
+def message_arrays(m):
+    costs = np.frombuffer(m.costs, dtype=np.float64)
+    return costs, np.frombuffer(m.paths, dtype=PATH_TYPE).reshape(len(costs), -1)
+
+
+# Binary form: sender, sequence number and number of destinations packed with pack_ints,
+# then the costs as 64-bit integers (-1 for unreachable) and the path matrix row by row
+COST_TYPE = np.dtype('<i8')
+
+
+def pack_message(m):
+    costs, paths = message_arrays(m)
+    reachable = costs[costs != np.inf]
+    if len(reachable) and reachable.max() >= 2 ** 63:
+        raise ValueError("routing message cost %d does not fit in 64 bits" % reachable.max())
+    wire_costs = np.where(costs == np.inf, -1, costs).astype(COST_TYPE)
+    return pack_ints([m.sender, m.seq_num, len(costs)]) + wire_costs.tobytes() + paths.tobytes()
+
+
+def unpack_message(data, offset):
+    start = offset + 1 + 3 * data[offset]  # after the width byte and the three integers
+    sender, seq_num, n = unpack_ints(data[:start], offset)
+    wire_costs = np.frombuffer(data, dtype=COST_TYPE, count=n, offset=start)
+    costs = np.where(wire_costs < 0, np.inf, wire_costs.astype(np.float64))
+    return Numpy_Distance_Vector_Message(sender, seq_num, costs.tobytes(), data[start + COST_TYPE.itemsize * n:])
+
+
+register_schema(Numpy_Distance_Vector_Message, 3, pack_message, unpack_message)
+
+
+# Distance vector with the tables kept as dense NumPy arrays.  Every node of a
+# simulation gives each node id the same column index (a map shared through sim.shared),
+# so a neighbor's vector can be used as is, without looking at its entries one by one.
+# For every neighbor the node keeps the cost array and path matrix it last sent.  The
+# table is recomputed as a column-wise min over (link cost + neighbor's costs), with the
+# direct links as the first candidate row, once for all the vectors that came in during
+# a time (or sooner if the routes are asked for).  Loops are prevented as in
+# DISTANCE_VECTOR: a neighbor's route whose path goes through this node is not used.
+class Numpy_Distance_Vector_Node(Node):
+    # Send the table once at the end of the current time instead of after every change
+    COALESCE = True
+
+    def __init__(self, node_id):
+        super().__init__(node_id)
+        self.index = None  # node id -> column, shared by all nodes of the simulation
+        self.link_costs = {}
+        self.neighbor_costs = {}  # neighbor -> cost array, inf where the route is unusable
+        self.neighbor_paths = {}  # neighbor -> path matrix
+        self.neighbor_seq_nums = {}
+        self.costs = np.zeros(0)
+        self.paths = np.full((0, 1), -1, dtype=PATH_TYPE)
+        self.seq_num = 0
+        self.stale = False  # vectors came in since the table was last computed
+        self.broadcast_pending = False
+
+    def __str__(self):
+        self.refresh()
+        routes = {}
+        for node, column in self.column_map().items():
+            if column < len(self.costs) and self.costs[column] != np.inf:
+                routes[node] = {"cost": int(self.costs[column]), "path": self.path(column)}
+        return json.dumps(routes)
+
+    def column_map(self):
+        if self.index is None:
+            self.index = self.sim.shared.setdefault("destination_index", {})
+        return self.index
+
+    def column(self, node):
+        index = self.column_map()
+        column = index.get(node)
+        if column is None:
+            column = index[node] = len(index)
+        return column
+
+    def path(self, column):
+        row = self.paths[column]
+        return row[row >= 0].tolist()
+
+    def link_has_been_updated(self, neighbor, latency):
+        self.column(self.id)
+        self.column(neighbor)
+        if latency == -1:
+            self.link_costs.pop(neighbor, None)
+            self.neighbor_costs.pop(neighbor, None)
+            self.neighbor_paths.pop(neighbor, None)
+            self.neighbor_seq_nums.pop(neighbor, None)
+        else:
+            self.link_costs[neighbor] = latency
+        self.recompute()
+
+    def refresh(self):
+        if self.stale:
+            self.recompute()
+
+    def recompute(self):
+        self.stale = False
+        n = len(self.index)
+        # neighbors in the order their first vector came in, so ties go the same way as
+        # in DISTANCE_VECTOR
+        neighbors = list(self.neighbor_costs)
+        width = max([1] + [paths.shape[1] for paths in self.neighbor_paths.values()])
+
+        # candidate 0 is the direct link, candidate i the route through neighbors[i - 1],
+        # with the path it would take after this node
+        candidates = np.full((len(neighbors) + 1, n), np.inf)
+        candidate_paths = np.full((len(neighbors) + 1, n, width), -1, dtype=PATH_TYPE)
+        for neighbor, link_cost in self.link_costs.items():
+            column = self.index[neighbor]
+            candidates[0, column] = link_cost
+            candidate_paths[0, column, 0] = neighbor
+        for i, neighbor in enumerate(neighbors, 1):
+            costs, paths = self.neighbor_costs[neighbor], self.neighbor_paths[neighbor]
+            candidates[i, :len(costs)] = costs + self.link_costs[neighbor]
+            candidate_paths[i, :len(costs), :paths.shape[1]] = paths
+        candidates[:, self.index[self.id]] = np.inf
+
+        best = candidates.argmin(axis=0)
+        columns = np.arange(n)
+        costs = candidates[best, columns]
+        paths = np.empty((n, width + 1), dtype=PATH_TYPE)
+        paths[:, 0] = np.where(costs != np.inf, self.id, -1)
+        paths[:, 1:] = np.where(paths[:, :1] >= 0, candidate_paths[best, columns], -1)
+        paths = paths[:, :max(1, int((paths >= 0).sum(axis=1).max(initial=0)))]
+
+        changed = not (np.array_equal(costs, self.costs) and np.array_equal(paths, self.paths))
+        self.costs, self.paths = costs, paths
+        if changed:
+            self.schedule_broadcast()
+
+    def schedule_broadcast(self):
+        if not self.COALESCE:
+            self.broadcast_to_neighbors()
+        elif not self.broadcast_pending:
+            self.broadcast_pending = True
+            self.request_end_of_tick()
+
+    def end_of_tick(self):
+        self.refresh()
+        if self.broadcast_pending:
+            self.broadcast_pending = False
+            self.broadcast_to_neighbors()
+
+    def broadcast_to_neighbors(self):
+        self.seq_num += 1
+        self.send_to_neighbors(Numpy_Distance_Vector_Message(self.id, self.seq_num, self.costs.tobytes(),
+                                                             np.ascontiguousarray(self.paths).tobytes()))
+
+    def process_incoming_routing_message(self, m):
+        neighbor = m.sender
+        if neighbor not in self.link_costs:
+            return  # sent over a link that is gone
+        # Ignore the message if the sequence number is outdated
+        if m.seq_num <= self.neighbor_seq_nums.get(neighbor, 0):
+            return
+        self.neighbor_seq_nums[neighbor] = m.seq_num
+
+        costs, paths = message_arrays(m)
+        # Loop prevention: routes that already go through this node are not usable
+        through_us = (paths == self.id).any(axis=1)
+        if through_us.any():
+            costs = np.where(through_us, np.inf, costs)
+        self.neighbor_costs[neighbor] = costs
+        self.neighbor_paths[neighbor] = paths
+        if self.COALESCE:
+            # recomputed once for all the vectors of this time
+            self.stale = True
+            self.request_end_of_tick()
+        else:
+            self.recompute()
+
+    def database_size(self):
+        self.refresh()
+        return int((self.costs != np.inf).sum()) + sum(int((costs != np.inf).sum()) for costs in self.neighbor_costs.values())
+
+    def get_next_hop(self, destination):
+        self.refresh()
+        column = self.column_map().get(destination)
+        if column is None or column >= len(self.costs) or self.costs[column] == np.inf:
+            return -1
+        return int(self.paths[column, 1])
@@ -0,0 +1,150 @@
+from link_state_node import Link_State_Node
+from simulator.codec import register_schema, pack_ints, unpack_ints
+from collections import namedtuple
+
+
+# A router's LSA as flooded by Router_LSA_Node: its links as (neighbor, cost) pairs under
+# one sequence number.  A message carries the LSAs a neighbor is owed.
+Router_LSA = namedtuple('Router_LSA', ['router', 'seq_num', 'links'])
+Router_LSA_Update = namedtuple('Router_LSA_Update', ['sender', 'lsas'])
+
+
+# Binary form, all packed with pack_ints: sender, number of LSAs, then router, sequence
+# number, number of links and the (neighbor, cost) pairs of every LSA
+def lsa_values(lsas):
+    values = [len(lsas)]
+    for router, seq_num, links in lsas:
+        values += (router, seq_num, len(links))
+        for neighbor, cost in links:
+            values += (neighbor, cost)
+    return values
+
+
+def read_lsas(values, i):
+    # the LSAs starting at values[i], and the index after them
+    lsas = []
+    for _ in range(values[i]):
+        end = i + 4 + 2 * values[i + 3]
+        links = values[i + 4:end]
+        lsas.append(Router_LSA(values[i + 1], values[i + 2], tuple(zip(links[::2], links[1::2]))))
+        i = end - 1
+    return tuple(lsas), i + 1
+
+
+def pack_update(m):
+    return pack_ints([m.sender] + lsa_values(m.lsas))
+
+
+def unpack_update(data, offset):
+    values = unpack_ints(data, offset)
+    return Router_LSA_Update(values[0], read_lsas(values, 1)[0])
+
+
+register_schema(Router_LSA_Update, 7, pack_update, unpack_update)
+
+
+# OSPF-style link state: every router originates one LSA listing all of its links
+# under a single sequence number.  Only changed LSAs are flooded; the whole database
+# is sent once, to a neighbor that has just come up.
+class Router_LSA_Node(Link_State_Node):
+    def __init__(self, id):
+        super().__init__(id)
+        self.lsas = {} # router -> (sequence number, {neighbor: cost})
+        self.sequenceNumber = 0
+        self.pendingLSAs = {} # neighbor -> routers whose LSA it gets at the end of the current time
+
+    def __str__(self):
+        return (
+            f"Node {self.id}\n"
+            f"Neighbors: {self.neighbors}\n"
+            f"LSAs: {self.lsas}\n"
+        )
+
+    def link_has_been_updated(self, neighbor, latency):
+        # latency = -1 if delete a link
+        isNew = latency != -1 and neighbor not in self.neighbors
+        if latency == -1:
+            self.neighbors.pop(neighbor, None)
+        else:
+            self.neighbors[neighbor] = latency
+        self.originate()
+
+        if isNew:
+            self.sendLSAs([neighbor], self.lsas)
+        self.sendLSAs([n for n in self.neighbors if n != neighbor or not isNew], [self.id])
+
+    def originate(self):
+        self.sequenceNumber += 1
+        self.install(self.id, self.sequenceNumber, dict(self.neighbors))
+
+    def install(self, router, sequenceNumber, links):
+        isFirst = router not in self.lsas
+        old = self.lsas.get(router, (0, {}))[1]
+        self.lsas[router] = (sequenceNumber, links)
+        if isFirst:
+            # links only the other end advertised so far may now be contradicted
+            for other, (_, otherLinks) in self.lsas.items():
+                if router in otherLinks and router not in links:
+                    self.updateAdjacency(other, router)
+        for neighbor in old:
+            if neighbor not in links:
+                self.removeLink(router, neighbor)
+        for neighbor, cost in links.items():
+            if old.get(neighbor) != cost:
+                self.setLink(router, neighbor, cost)
+
+    def pairCost(self, a, b):
+        # a link counts while every end whose LSA we hold lists it, so the stale LSA of
+        # a router that went away cannot pull routes through it once its neighbors drop it
+        links = ((a, b), (b, a))
+        if any(link not in self.dataBase and link[0] in self.lsas for link in links):
+            return None
+        return min(self.dataBase[link] for link in links if link in self.dataBase)
+
+    def sendLSAs(self, neighbors, routers):
+        if not neighbors or not routers:
+            return
+        if self.COALESCE:
+            for neighbor in neighbors:
+                self.pendingLSAs.setdefault(neighbor, {}).update(dict.fromkeys(routers))
+            self.request_end_of_tick()
+        else:
+            self.sendNow(neighbors, routers)
+
+    def end_of_tick(self):
+        # one message per distinct set of LSAs, the newest copy of each
+        pending, self.pendingLSAs = self.pendingLSAs, {}
+        groups = {}
+        for neighbor, routers in pending.items():
+            if neighbor in self.neighbors:
+                groups.setdefault(tuple(routers), []).append(neighbor)
+        for routers, neighbors in groups.items():
+            self.sendNow(neighbors, routers)
+
+    def lsaRecord(self, router):
+        sequenceNumber, links = self.lsas[router]
+        return Router_LSA(router, sequenceNumber, tuple(links.items()))
+
+    def sendNow(self, neighbors, routers):
+        message = Router_LSA_Update(self.id, tuple(self.lsaRecord(router) for router in routers))
+        if len(neighbors) == len(self.neighbors):
+            self.send_to_neighbors(message)
+        else:
+            for neighbor in neighbors:
+                self.send_to_neighbor(neighbor, message)
+
+    def process_incoming_routing_message(self, m):
+        sender = m.sender
+        changed = []
+        for router, sequenceNumber, links in m.lsas:
+            if router == self.id:
+                # our own LSA from before a restart: outbid it, the sender needs the new one too
+                if sequenceNumber > self.sequenceNumber or (
+                        sequenceNumber == self.sequenceNumber and dict(links) != self.lsas[self.id][1]):
+                    self.sequenceNumber = sequenceNumber
+                    self.originate()
+                    self.sendLSAs(list(self.neighbors), [self.id])
+            elif sequenceNumber > self.lsas.get(router, (0, {}))[0]:
+                self.install(router, sequenceNumber, dict(links))
+                changed.append(router)
+        self.sendLSAs([n for n in self.neighbors if n != sender], changed)
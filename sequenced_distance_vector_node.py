@@ -0,0 +1,186 @@
+import json
+from collections import namedtuple
+from distance_vector_node import Table_Request
+from simulator.codec import register_schema, pack_ints, unpack_ints
+from simulator.node import Node
+
+
+# What Sequenced_Distance_Vector_Node sends: (destination, sequence number, cost) entries,
+# cost None if unreachable, either those that changed or the whole table when full is
+# set.  A neighbor asks for the whole table with a Table_Request.
+Sequenced_Update = namedtuple('Sequenced_Update', ['sender', 'seq_num', 'full', 'routes'])
+
+
+# Binary form, all packed with pack_ints: sender, sequence number, 1 if full else 0, then
+# destination, sequence number and cost (-1 if unreachable) of every route
+def pack_update(m):
+    values = [m.sender, m.seq_num, int(m.full)]
+    for dst, seq_num, cost in m.routes:
+        values += (dst, seq_num, -1 if cost is None else cost)
+    return pack_ints(values)
+
+
+def unpack_update(data, offset):
+    values = unpack_ints(data, offset)
+    routes = iter(values[3:])
+    return Sequenced_Update(values[0], values[1], bool(values[2]),
+                            tuple((dst, seq_num, None if cost == -1 else cost) for dst, seq_num, cost in zip(routes, routes, routes)))
+
+
+register_schema(Sequenced_Update, 6, pack_update, unpack_update)
+
+
+# Distance vector without paths, in the style of DSDV.  Each route is just
+# (sequence number, cost, next hop).  Only the destination issues even sequence numbers
+# for itself. A node that loses the route through a link (the link is gone or got more
+# expensive) marks it unreachable under the next, odd, sequence number. That spreads to
+# everyone, including the destination, which then answers with a new even number and
+# the routes are rebuilt from scratch. Meanwhile the destination's neighbors offer their
+# links under the odd number, which beats unreachable, and both ends of the link that
+# changed issue a new even number for themselves right away. A newer sequence number
+# always wins. Under the same number a route is taken only if it is cheaper, or if it
+# comes from the current next hop, so routes never loop. Routes through a neighbor are
+# advertised back to that neighbor as unreachable (poisoned reverse).
+# Like DISTANCE_VECTOR_INCREMENTAL, a node sends only the routes that changed, numbered
+# per neighbor, and sends the whole table to a neighbor that asks for it or whose link changed.
+class Sequenced_Distance_Vector_Node(Node):
+    # Send the updates once at the end of the current time instead of after every change
+    COALESCE = True
+
+    def __init__(self, node_id):
+        super().__init__(node_id)
+        self.routes = {node_id: (0, 0, None)}  # destination -> (sequence number, cost, next hop), cost None if unreachable
+        self.link_costs = {}
+        self.changed = set()  # destinations to advertise on the next send
+        self.pending_full = set()  # neighbors that get the whole table on the next send
+        self.sent_seq_nums = {}  # neighbor -> number of the last update sent to it
+        self.neighbor_seq_nums = {}  # neighbor -> number of the last update taken from it, None while waiting for a whole table
+
+    def __str__(self):
+        return json.dumps({dst: list(route) for dst, route in self.routes.items()})
+
+    def link_has_been_updated(self, neighbor, latency):
+        old = self.link_costs.get(neighbor)
+        if latency == -1 or (old is not None and latency > old):
+            seq_num = self.routes[self.id][0]
+            self.set_route(self.id, seq_num + 2, 0, None)
+        if latency == -1:
+            self.link_costs.pop(neighbor, None)
+            self.pending_full.discard(neighbor)
+            self.neighbor_seq_nums.pop(neighbor, None)
+            self.poison(neighbor)
+        else:
+            self.link_costs[neighbor] = latency
+            self.pending_full.add(neighbor)
+            if old is None:
+                self.neighbor_seq_nums[neighbor] = None
+            elif latency > old:
+                self.poison(neighbor)
+            elif latency < old:
+                for dst, (seq_num, cost, hop) in self.routes.items():
+                    if hop == neighbor:
+                        self.set_route(dst, seq_num, cost - old + latency, hop)
+            self.direct_route(neighbor)
+        self.schedule_updates()
+
+    def direct_route(self, neighbor):
+        # The link itself is a route to the neighbor, good under the last number we have
+        # for it, even one that marked it unreachable: its cost from the neighbor is always
+        # 0. Only the neighbor issues its next even number.
+        latency = self.link_costs[neighbor]
+        current = self.routes.get(neighbor)
+        if current is None:
+            self.set_route(neighbor, 0, latency, neighbor)
+        elif current[1] is None or latency < current[1] or (current[2] == neighbor and latency != current[1]):
+            self.set_route(neighbor, current[0], latency, neighbor)
+
+    def poison(self, neighbor):
+        for dst, (seq_num, cost, hop) in list(self.routes.items()):
+            if hop == neighbor:
+                self.set_route(dst, seq_num + 1, None, None)
+
+    def set_route(self, dst, seq_num, cost, hop):
+        self.routes[dst] = (seq_num, cost, hop)
+        self.changed.add(dst)
+
+    def schedule_updates(self):
+        if self.COALESCE:
+            self.request_end_of_tick()
+        else:
+            self.send_updates()
+
+    def end_of_tick(self):
+        self.send_updates()
+
+    def send_updates(self):
+        for neighbor in self.link_costs:
+            if neighbor in self.pending_full:
+                self.send_update(neighbor, True, self.routes)
+            elif self.changed:
+                self.send_update(neighbor, False, self.changed)
+        self.pending_full.clear()
+        self.changed.clear()
+
+    def send_update(self, neighbor, full, destinations):
+        seq_num = self.sent_seq_nums.get(neighbor, 0) + 1
+        self.sent_seq_nums[neighbor] = seq_num
+        routes = []
+        for dst in destinations:
+            route_seq_num, cost, hop = self.routes[dst]
+            # poisoned reverse: the neighbor cannot reach dst through us
+            routes.append((dst, route_seq_num, None if hop == neighbor else cost))
+        self.send_to_neighbor(neighbor, Sequenced_Update(self.id, seq_num, full, tuple(routes)))
+
+    def process_incoming_routing_message(self, m):
+        neighbor = m.sender
+        if neighbor not in self.link_costs:
+            return  # sent over a link that is gone
+        if isinstance(m, Table_Request):
+            self.pending_full.add(neighbor)
+            self.schedule_updates()
+            return
+
+        seq_num, last = m.seq_num, self.neighbor_seq_nums.get(neighbor)
+        if m.full:
+            if last is not None and seq_num <= last:
+                return
+        elif last is None or seq_num <= last:
+            return  # waiting for a whole table, or an old update
+        elif seq_num != last + 1:
+            # an earlier update is still on its way, start over from a whole table
+            self.neighbor_seq_nums[neighbor] = None
+            self.send_to_neighbor(neighbor, Table_Request(self.id))
+            return
+        self.neighbor_seq_nums[neighbor] = seq_num
+
+        link_cost = self.link_costs[neighbor]
+        for dst, route_seq_num, cost in m.routes:
+            self.process_route(neighbor, dst, route_seq_num, None if cost is None else cost + link_cost)
+        self.schedule_updates()
+
+    def process_route(self, neighbor, dst, seq_num, cost):
+        current = self.routes.get(dst)
+        if dst == self.id:
+            # someone has a newer number for us than we do: take it, or the next even one
+            if seq_num > current[0]:
+                self.set_route(dst, seq_num + seq_num % 2, 0, None)
+            return
+        if current is None or seq_num > current[0]:
+            self.set_route(dst, seq_num, cost, None if cost is None else neighbor)
+        elif seq_num == current[0]:
+            if current[2] == neighbor:
+                if cost != current[1]:
+                    self.set_route(dst, seq_num, cost, None if cost is None else neighbor)
+            elif cost is not None and (current[1] is None or cost < current[1]):
+                self.set_route(dst, seq_num, cost, neighbor)
+        if dst in self.link_costs:
+            self.direct_route(dst)
+
+    def database_size(self):
+        return len(self.routes)
+
+    def get_next_hop(self, destination):
+        route = self.routes.get(destination)
+        if route is None or route[1] is None:
+            return -1
+        return route[2]
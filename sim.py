@@ -1,57 +1,106 @@
 import sys
+import argparse
+import json
 import logging
 
 from simulator.config import *
-from simulator.topology import Topology, Get_Time
-from simulator.event_queue import Event_Queue
+from simulator.codec import CODECS
+from simulator.convergence import Convergence_Tracker, TOPOLOGY_KINDS
+from simulator.event import Event
+from simulator.profiler import Profiler
+from simulator.topology import Topology
 
 
 class Sim(Topology):
 
-    def __init__(self, algorithm, event_file, step='NORMAL'):
-        super().__init__(algorithm, step)
+    def __init__(self, algorithm, event_file, step='NORMAL', render=True, drop_in_flight=False, check_messages=False,
+                 codec='none', convergence=False, check_convergence=False, profile=False):
+        super().__init__(algorithm, step, render, drop_in_flight, check_messages, codec)
+        if convergence or check_convergence:
+            self.convergence = Convergence_Tracker(self, check_convergence)
+        if profile:
+            self.profiler = Profiler()
+            self.profiler.attach(self)
         self.load_command_file(event_file)
         self.dump_sim()
         self.dispatch_event(self.step)
         self.logging.info("Total messages sent: %d" % self.message_count)
+        self.logging.info("Total bytes sent: %d" % self.byte_count)
+        for message_type, (count, size) in sorted(self.type_bytes.items()):
+            self.logging.info("Sent as %s: %d messages, %d bytes" % (message_type, count, size))
+        if self.link_bytes:
+            link, size = self.busiest_link()
+            self.logging.info("Bytes per link: mean %.1f, max %d on link %s-%s"
+                              % (sum(self.link_bytes.values()) / len(self.link_bytes), size, link[0], link[1]))
+        sizes = self.database_sizes()
+        if sizes:
+            self.logging.info("Database size per node: mean %.1f, max %d" % (sum(sizes) / len(sizes), max(sizes)))
+        if self.drop_in_flight:
+            self.logging.info("Messages dropped in flight: %d" % self.dropped_count)
+        if self.convergence is not None:
+            self.logging.info("Convergence: " + self.convergence.summary())
 
     def __str__(self):
         ans = "==== Print Topology ====\n"
         ans += super().__str__()
         ans += "==== Print Event ====\n"
-        ans += Event_Queue.Str()
+        ans += self.event_queue.Str()
         return ans
 
     def dump_sim(self):
-        self.logging.info("DUMP_SIM at Time %d\n" % Get_Time() + str(self))
+        self.logging.info("DUMP_SIM at Time %d\n" % self.get_time() + str(self))
 
     def dispatch_event(self, step='NORMAL'):
-        e = Event_Queue.Get_Earliest()
+        convergence = self.convergence
+        dispatch = self.profiler.dispatch if self.profiler is not None else Event.dispatch
+        e = self.event_queue.Get_Earliest()
         while e:
-            e.dispatch()
+            if convergence is not None and e.kind in TOPOLOGY_KINDS:
+                convergence.change(e)
+            dispatch(e)
+            if (self.end_of_tick_nodes or convergence is not None) and not self.event_queue.Has_Events_At(e.time_stamp):
+                if self.end_of_tick_nodes:
+                    self.end_of_tick()
+                if convergence is not None:
+                    convergence.tick_ended(e.time_stamp)
             if step == 'SINGLE_STEP':
                 self.logging.info(str(e))
                 self.wait()
-            e = Event_Queue.Get_Earliest()
+            e = self.event_queue.Get_Earliest()
+        if convergence is not None:
+            convergence.finish()
+        if self.profiler is not None:
+            self.profiler.stop()
 
     def print_comment(self, comment):
-        self.logging.info('Time: %d, Comment: %s' % (Get_Time(), comment))
+        self.logging.info('Time: %d, Comment: %s' % (self.get_time(), comment))
 
 
 def main():
-    if len(sys.argv) < 3 or len(sys.argv) > 4 or sys.argv[1] not in ROUTE_ALGORITHM:
-        sys.stderr.write(USAGE_STR)
-        sys.exit(-1)
-
-    step = 'NO_STOP'
-    if len(sys.argv) == 4:
-        if sys.argv[3] not in STEP_COMMAND:
-            sys.stderr.write(USAGE_STR)
-            sys.exit(-1)
-        else:
-            step = sys.argv[3]
-
-    s = Sim(sys.argv[1], sys.argv[2], step)
+    parser = argparse.ArgumentParser(usage=USAGE_STR)
+    parser.add_argument('route_algorithm', choices=ROUTE_ALGORITHM)
+    parser.add_argument('event')
+    parser.add_argument('step', nargs='?', default='NO_STOP', choices=STEP_COMMAND)
+    parser.add_argument('--drop-in-flight', action='store_true')
+    parser.add_argument('--check-messages', action='store_true')
+    parser.add_argument('--codec', default='none', choices=['none'] + list(CODECS))
+    parser.add_argument('--convergence', metavar='FILE', default=None)
+    parser.add_argument('--check-convergence', action='store_true')
+    parser.add_argument('--profile', metavar='PREFIX', nargs='?', const=OUTPUT_PATH + 'profile', default=None)
+    args = parser.parse_args()
+    if args.check_convergence and args.convergence is None:
+        parser.error("--check-convergence needs --convergence FILE to write the records to")
+
+    s = Sim(args.route_algorithm, args.event, args.step, drop_in_flight=args.drop_in_flight,
+            check_messages=args.check_messages, codec=args.codec,
+            convergence=args.convergence is not None, check_convergence=args.check_convergence,
+            profile=args.profile is not None)
+    if args.convergence:
+        with open(args.convergence, "w") as f:
+            json.dump(s.convergence.records, f, indent=2)
+    if args.profile:
+        s.profiler.write(args.profile)
+        logging.info("Profile written to %s.json and %s.collapsed" % (args.profile, args.profile))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,77 @@
+import struct
+
+
+# Wire formats for routing messages.  With a codec, the simulator encodes every message
+# once when it is sent, puts the bytes on the links, and decodes a fresh copy for every
+# receiver, so the byte counts are those of a real protocol.
+# A binary message is one type byte followed by the body of that type.  Node modules
+# register a pack / unpack pair for the message types they send; strings are built in.
+
+SCHEMAS = {}  # message class -> (type byte, name, pack, unpack)
+BY_TAG = {}  # type byte -> (name, unpack)
+
+
+def register_schema(cls, tag, pack, unpack):
+    # pack(m) returns the body as bytes, unpack(data, offset) rebuilds the message
+    if tag in BY_TAG:
+        raise ValueError("type byte %d is already used by %s" % (tag, BY_TAG[tag][0]))
+    SCHEMAS[cls] = (bytes([tag]), cls.__name__, pack, unpack)
+    BY_TAG[tag] = (cls.__name__, unpack)
+
+
+def pack_str(m):
+    return m.encode('utf-8')
+
+
+def unpack_str(data, offset):
+    return data[offset:].decode('utf-8')
+
+
+register_schema(str, 0, pack_str, unpack_str)
+
+
+class Binary_Codec:
+    name = 'binary'
+
+    def encode(self, m):
+        schema = SCHEMAS.get(type(m))
+        if schema is None:
+            raise TypeError("no wire format for a routing message of type %s" % type(m).__name__)
+        return schema[0] + schema[2](m)
+
+    def decode(self, data):
+        return BY_TAG[data[0]][1](data, 1)
+
+    def message_type(self, data):
+        return BY_TAG[data[0]][0]
+
+
+CODECS = {
+    'binary': Binary_Codec,
+}
+
+
+# Helpers for schemas made of integers.  Costs are any Python int, so the integers of a
+# message are packed as 32-bit ones when they all fit and as 64-bit ones otherwise, after
+# one byte giving the width.
+INT32_RANGE = range(-2 ** 31, 2 ** 31)
+INT64_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def int_width(values):
+    low, high = min(values, default=0), max(values, default=0)
+    if low in INT32_RANGE and high in INT32_RANGE:
+        return 4
+    if low in INT64_RANGE and high in INT64_RANGE:
+        return 8
+    raise ValueError("routing message value %d does not fit in 64 bits" % (high if high not in INT64_RANGE else low))
+
+
+def pack_ints(values):
+    width = int_width(values)
+    return bytes([width]) + struct.pack('<%d%s' % (len(values), 'i' if width == 4 else 'q'), *values)
+
+
+def unpack_ints(data, offset):
+    width = data[offset]
+    return struct.unpack_from('<%d%s' % ((len(data) - offset - 1) // width, 'i' if width == 4 else 'q'), data, offset + 1)
@@ -1,11 +1,20 @@
 from generic_node import Generic_Node
-from distance_vector_node import Distance_Vector_Node
+from distance_vector_node import Distance_Vector_Node, Incremental_Distance_Vector_Node
+from sequenced_distance_vector_node import Sequenced_Distance_Vector_Node
+from numpy_distance_vector_node import Numpy_Distance_Vector_Node
 from link_state_node import Link_State_Node
+from router_lsa_node import Router_LSA_Node
+from area_link_state_node import Area_Link_State_Node
 
 ROUTE_ALGORITHM = [
     "GENERIC",
     "DISTANCE_VECTOR",
-    "LINK_STATE"
+    "DISTANCE_VECTOR_INCREMENTAL",
+    "DISTANCE_VECTOR_SEQUENCED",
+    "DISTANCE_VECTOR_NUMPY",
+    "LINK_STATE",
+    "LINK_STATE_ROUTER_LSA",
+    "LINK_STATE_AREA"
 ]
 
 STEP_COMMAND = [
@@ -17,7 +26,12 @@ STEP_COMMAND = [
 ROUTE_ALGORITHM_NODE = {
     "GENERIC" : Generic_Node,
     "DISTANCE_VECTOR" : Distance_Vector_Node,
-    "LINK_STATE" : Link_State_Node
+    "DISTANCE_VECTOR_INCREMENTAL" : Incremental_Distance_Vector_Node,
+    "DISTANCE_VECTOR_SEQUENCED" : Sequenced_Distance_Vector_Node,
+    "DISTANCE_VECTOR_NUMPY" : Numpy_Distance_Vector_Node,
+    "LINK_STATE" : Link_State_Node,
+    "LINK_STATE_ROUTER_LSA" : Router_LSA_Node,
+    "LINK_STATE_AREA" : Area_Link_State_Node
 }
 
 class EVENT_TYPE:
@@ -33,20 +47,36 @@ class EVENT_TYPE:
     DRAW_TOPOLOGY = "DRAW_TOPOLOGY"
     DRAW_PATH = "DRAW_PATH"
     DRAW_TREE = "DRAW_TREE"
+    VERIFY_ALL = "VERIFY_ALL"
+    VERIFY_SAMPLE = "VERIFY_SAMPLE"
     DUMP_NODE = "DUMP_NODE"
     DUMP_SIM = "DUMP_SIM"
+    SET_AREA = "SET_AREA"
 
     # Not for user
     ROUTING_MESSAGE_ARRIVAL = "ROUTING_MESSAGE_ARRIVAL"
+    ROUTING_MESSAGE_FANOUT = "ROUTING_MESSAGE_FANOUT"
     SEND_LINK = "SEND_LINK"
 
 
 OUTPUT_PATH = "output/"
 
-USAGE_STR = "usage: sim.py route_algorithm event [step=NORMAL]\n" \
-            "\troute_algorithm\t- {GENERIC DISTANCE_VECTOR LINK_STATE}\n" \
+# Number of shortest path trees the DRAW_PATH / DRAW_TREE checker keeps up to date
+ORACLE_CACHE_SIZE = 64
+
+# Mismatching (source, destination) pairs printed by VERIFY_ALL / VERIFY_SAMPLE
+VERIFY_MAX_REPORTED = 20
+
+USAGE_STR = "sim.py route_algorithm event [step=NO_STOP] [options]\n" \
+            "\troute_algorithm\t- {" + " ".join(ROUTE_ALGORITHM) + "}\n" \
             "\tevent\t\t\t- a file\n" \
-            "\tstep\t\t\t- {NORMAL SINGLE_STEP NO_STOP}"
+            "\tstep\t\t\t- {NORMAL SINGLE_STEP NO_STOP}\n" \
+            "\t--drop-in-flight\t- drop messages still on a link when it is deleted\n" \
+            "\t--check-messages\t- check that structured messages are immutable when they are sent\n" \
+            "\t--codec\t\t\t- {none binary}, encode messages on the links and count their bytes\n" \
+            "\t--convergence FILE\t- write how long each batch of topology changes takes to converge, as JSON\n" \
+            "\t--check-convergence\t- with --convergence, also check every node's next hops once the network is quiet\n" \
+            "\t--profile [PREFIX]\t- write a timing report to PREFIX.json and collapsed stacks to PREFIX.collapsed"
 
 
 LOGGING_FORMAT = "[%(asctime)s][%(levelname)s] %(name)s: %(message)s"
@@ -0,0 +1,81 @@
+from simulator.config import EVENT_TYPE
+from simulator.event import KIND
+from simulator.verify import verify_routes
+
+
+TOPOLOGY_CHANGES = (EVENT_TYPE.ADD_LINK, EVENT_TYPE.CHANGE_LINK, EVENT_TYPE.DELETE_LINK, EVENT_TYPE.DELETE_NODE)
+TOPOLOGY_KINDS = frozenset(KIND[event_type] for event_type in TOPOLOGY_CHANGES)
+
+
+class Convergence_Tracker:
+    # Splits a run into batches of topology changes, one batch per time stamp, and
+    # measures how long the routing messages of each batch take to go quiet.  The
+    # network is quiet at the end of a time when no routing message is on a link and no
+    # node waits for end_of_tick.  A batch that is followed by the next one before it is
+    # quiet is recorded as not converged.
+    def __init__(self, sim, check_routes=False):
+        self.sim = sim
+        # when set, every node's next hops are compared with the shortest paths once quiet
+        self.check_routes = check_routes
+        self.records = []
+        self.current = None
+        self.touched = set()
+
+    def change(self, e):
+        if self.current is not None and self.current['time'] != e.time_stamp:
+            self.close(False)
+        if self.current is None:
+            self.open(e.time_stamp)
+        changes = self.current['changes']
+        changes[e.event_type] = changes.get(e.event_type, 0) + 1
+
+    def open(self, time):
+        self.current = {'time': time, 'changes': {}}
+        self.touched = set()
+        self.start_messages = self.seen_messages = self.sim.message_count
+        self.start_bytes = self.sim.byte_count
+        self.start_unsized = self.sim.unsized_count
+        self.last_activity = time
+
+    def touch(self, node):
+        self.touched.add(node)
+
+    def tick_ended(self, time):
+        if self.current is None:
+            return
+        if self.sim.message_count != self.seen_messages:
+            self.seen_messages = self.sim.message_count
+            self.last_activity = time
+        if self.sim.in_flight_count() == 0 and not self.sim.end_of_tick_nodes:
+            self.close(True)
+
+    def finish(self):
+        if self.current is not None:
+            self.close(self.sim.in_flight_count() == 0)
+
+    def close(self, converged):
+        record = self.current
+        record['converged'] = converged
+        record['quiet_at'] = self.last_activity if converged else None
+        record['convergence_time'] = self.last_activity - record['time'] if converged else None
+        record['messages'] = self.sim.message_count - self.start_messages
+        # structured messages have no size without a codec, then the bytes are unknown
+        record['bytes'] = self.sim.byte_count - self.start_bytes \
+            if self.sim.unsized_count == self.start_unsized else None
+        record['nodes_touched'] = len(self.touched)
+        record['routes_correct'] = None
+        record['mismatches'] = None
+        if converged and self.check_routes and self.sim.adj:
+            checked, mismatches = verify_routes(self.sim.adj, self.sim.nodes, list(self.sim.adj))
+            record['routes_correct'] = not mismatches
+            record['mismatches'] = len(mismatches)
+        self.records.append(record)
+        self.current = None
+        self.touched = set()
+
+    def summary(self):
+        times = [r['convergence_time'] for r in self.records if r['converged']]
+        if not times:
+            return "%d batches of changes, none converged" % len(self.records)
+        return "%d batches of changes, %d converged, convergence time mean %.1f, max %s" \
+               % (len(self.records), len(times), sum(times) / len(times), max(times))
@@ -3,22 +3,74 @@ import sys
 from simulator.config import *
 
 
+def ignore(e):
+    pass
+    # sys.stderr.write("Unknown event type %s" % e.event_type)
+    # sys.exit(-1)
+
+
+# Event handlers, indexed by the small-int kind of the event
+HANDLERS = [
+    (EVENT_TYPE.ADD_NODE, lambda e: e.sim.add_node(e.arg1)),
+    (EVENT_TYPE.ADD_LINK, lambda e: e.sim.add_link(e.arg1, e.arg2, e.arg3)),
+    (EVENT_TYPE.CHANGE_LINK, lambda e: e.sim.change_link(e.arg1, e.arg2, e.arg3)),
+    (EVENT_TYPE.DELETE_LINK, lambda e: e.sim.delete_link(e.arg1, e.arg2)),
+    (EVENT_TYPE.DELETE_NODE, lambda e: e.sim.delete_node(e.arg1)),
+    (EVENT_TYPE.PRINT, lambda e: e.sim.print_comment(e.arg1)),
+    (EVENT_TYPE.DUMP_NODE, lambda e: e.sim.dump_node(e.arg1)),
+    (EVENT_TYPE.DRAW_TOPOLOGY, lambda e: e.sim.draw_topology()),
+    (EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL, lambda e: e.sim.routing_message_arrival(e.arg1, e.arg2, e.arg3)),
+    (EVENT_TYPE.ROUTING_MESSAGE_FANOUT, lambda e: e.sim.routing_message_fanout(e.arg1, e.arg2, e.arg3)),
+    (EVENT_TYPE.DUMP_SIM, lambda e: e.sim.dump_sim()),
+    (EVENT_TYPE.DRAW_PATH, lambda e: e.sim.draw_path(e.arg1, e.arg2)),
+    (EVENT_TYPE.DRAW_TREE, lambda e: e.sim.draw_tree(e.arg1)),
+    (EVENT_TYPE.VERIFY_ALL, lambda e: e.sim.verify_all()),
+    (EVENT_TYPE.VERIFY_SAMPLE, lambda e: e.sim.verify_sample(e.arg1)),
+    (EVENT_TYPE.SET_AREA, lambda e: e.sim.set_area(e.arg1, e.arg2)),
+    (EVENT_TYPE.SEND_LINK, lambda e: e.sim.send_link(e.arg1, e.arg2, e.arg3)),
+]
+
+DISPATCH = [handler for _, handler in HANDLERS]
+NAMES = [event_type for event_type, _ in HANDLERS]
+KIND = {event_type: kind for kind, event_type in enumerate(NAMES)}
+SEND_LINK_KIND = KIND[EVENT_TYPE.SEND_LINK]
+
+
+def kind_of(event_type):
+    kind = KIND.get(event_type)
+    if kind is None:
+        # unknown commands from an event file get a kind of their own that does nothing
+        kind = KIND[event_type] = len(NAMES)
+        NAMES.append(event_type)
+        DISPATCH.append(ignore)
+    return kind
+
+
 class Event:
+    # Events are created by the million, so keep them small.
+    # Queues order events by (time_stamp, phase) and then by insertion order;
+    # SEND_LINK has phase 1 so it runs last within a second.
+    __slots__ = ('time_stamp', 'kind', 'sim', 'arg1', 'arg2', 'arg3')
 
     def __init__(self, time_stamp, event_type, sim, arg1 = -1, arg2 = -1, arg3 = -1):
         self.time_stamp = time_stamp
-        self.event_type = event_type
+        self.kind = kind_of(event_type)
         self.sim = sim
 
         self.arg1 = arg1
         self.arg2 = arg2
         self.arg3 = arg3
 
+    @property
+    def event_type(self):
+        return NAMES[self.kind]
+
+    @property
+    def phase(self):
+        return 1 if self.kind == SEND_LINK_KIND else 0
+
     def __lt__(self, other):
-        if self.time_stamp == other.time_stamp:
-            if self.event_type != EVENT_TYPE.SEND_LINK and other.event_type == EVENT_TYPE.SEND_LINK:
-                return True
-        return self.time_stamp < other.time_stamp
+        return (self.time_stamp, self.phase) < (other.time_stamp, other.phase)
 
     def __str__(self):
         args = ""
@@ -32,33 +84,4 @@ class Event:
         return "Time_Stamp: " + str(self.time_stamp) + " Event_Type: " + self.event_type + args
 
     def dispatch(self):
-        if self.event_type == EVENT_TYPE.ADD_NODE:
-            self.sim.add_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.ADD_LINK:
-            self.sim.add_link(self.arg1, self.arg2, self.arg3)
-        elif self.event_type == EVENT_TYPE.CHANGE_LINK:
-            self.sim.change_link(self.arg1, self.arg2, self. arg3)
-        elif self.event_type == EVENT_TYPE.DELETE_LINK:
-            self.sim.delete_link(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DELETE_NODE:
-            self.sim.delete_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.PRINT:
-            self.sim.print_comment(self.arg1)
-        elif self.event_type == EVENT_TYPE.DUMP_NODE:
-            self.sim.dump_node(self.arg1)
-        elif self.event_type == EVENT_TYPE.DRAW_TOPOLOGY:
-            self.sim.draw_topology()
-        elif self.event_type == EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL:
-            self.sim.routing_message_arrival(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DUMP_SIM:
-            self.sim.dump_sim()
-        elif self.event_type == EVENT_TYPE.DRAW_PATH:
-            self.sim.draw_path(self.arg1, self.arg2)
-        elif self.event_type == EVENT_TYPE.DRAW_TREE:
-            self.sim.draw_tree(self.arg1)
-        elif self.event_type == EVENT_TYPE.SEND_LINK:
-            self.sim.send_link(self.arg1, self.arg2, self.arg3)
-        else:
-            pass
-            # sys.stderr.write("Unknown event type %s" % self.event_type)
-            # sys.exit(-1)
+        DISPATCH[self.kind](self)
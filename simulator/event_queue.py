@@ -1,30 +1,160 @@
 import heapq
+import itertools
+from collections import deque
+
+
+class Heap_Queue:
+    # Binary heap of (time_stamp, phase, seq, event) tuples, seq being the insertion order.
+    # Used as a fallback when a time stamp is not an integer.
+    def __init__(self, events=()):
+        self.seq = itertools.count()
+        self.q = []
+        for e in events:
+            self.push(e)
+
+    def __len__(self):
+        return len(self.q)
+
+    def push(self, e):
+        heapq.heappush(self.q, (e.time_stamp, e.phase, next(self.seq), e))
+        return True
+
+    def pop(self):
+        if self.q == []:
+            return None
+        return heapq.heappop(self.q)[3]
+
+    def has_events_at(self, time_stamp):
+        return self.q != [] and self.q[0][0] == time_stamp
+
+    def events(self):
+        return [e for _, _, _, e in sorted(self.q)]
+
+
+class Calendar_Queue:
+    # Calendar queue for integer time stamps.
+    # A ring of one-second buckets covers [base, base + RING_SIZE); events further
+    # in the future wait in per-second overflow lists, found through a heap of
+    # their time stamps, and move into the ring as time advances.
+    # Each bucket holds two FIFO lists so SEND_LINK runs after every other event
+    # of the same second, and ties break by insertion order.
+    RING_SIZE = 1024
+
+    def __init__(self):
+        self.ring = [None] * self.RING_SIZE
+        self.base = 0
+        self.cursor = 0
+        self.count = 0
+        self.overflow = {}  # time_stamp -> events, in posting order
+        self.overflow_times = []  # heap of the keys of overflow
+        self.overflow_count = 0
+
+    def __len__(self):
+        return self.count + self.overflow_count
+
+    def push(self, e):
+        time_stamp = e.time_stamp
+        if not isinstance(time_stamp, int) or time_stamp < self.base:
+            return False
+        if time_stamp - self.base < self.RING_SIZE:
+            self.put_in_ring(e)
+        else:
+            events = self.overflow.get(time_stamp)
+            if events is None:
+                events = self.overflow[time_stamp] = []
+                heapq.heappush(self.overflow_times, time_stamp)
+            events.append(e)
+            self.overflow_count += 1
+        return True
+
+    def put_in_ring(self, e):
+        slot = (self.cursor + e.time_stamp - self.base) % self.RING_SIZE
+        bucket = self.ring[slot]
+        if bucket is None:
+            bucket = self.ring[slot] = (deque(), deque())
+        bucket[e.phase].append(e)
+        self.count += 1
+
+    def pop(self):
+        while True:
+            if self.count == 0:
+                if not self.overflow_times:
+                    return None
+                # nothing scheduled in the ring, jump straight to the next overflow event
+                self.ring = [None] * self.RING_SIZE
+                self.base = self.overflow_times[0]
+                self.cursor = 0
+                self.refill()
+
+            bucket = self.ring[self.cursor]
+            if bucket is not None:
+                for events in bucket:
+                    if events:
+                        self.count -= 1
+                        return events.popleft()
+                self.ring[self.cursor] = None
+
+            self.cursor = (self.cursor + 1) % self.RING_SIZE
+            self.base += 1
+            self.refill()
+
+    def has_events_at(self, time_stamp):
+        # events are only popped at self.base, so anything left at that time is in the current bucket
+        bucket = self.ring[self.cursor]
+        return time_stamp == self.base and bucket is not None and any(bucket)
+
+    def refill(self):
+        horizon = self.base + self.RING_SIZE
+        while self.overflow_times and self.overflow_times[0] < horizon:
+            events = self.overflow.pop(heapq.heappop(self.overflow_times))
+            self.overflow_count -= len(events)
+            for e in events:
+                self.put_in_ring(e)
+
+    def events(self):
+        ans = []
+        for i in range(self.RING_SIZE):
+            bucket = self.ring[(self.cursor + i) % self.RING_SIZE]
+            if bucket is not None:
+                ans.extend(bucket[0])
+                ans.extend(bucket[1])
+        for time_stamp in sorted(self.overflow_times):
+            ans.extend(sorted(self.overflow[time_stamp], key=lambda e: e.phase))
+        return ans
 
 
 class Event_Queue:
-    q = []
-    Current_Time = 0
+    def __init__(self):
+        self.q = Calendar_Queue()
+        self.Current_Time = 0
+        self.Events_Popped = 0  # events handed out by Get_Earliest, for the benchmarks
 
-    @staticmethod
-    def Post(e):
-        heapq.heappush(Event_Queue.q, e)
+    def Post(self, e):
+        if not self.q.push(e):
+            # non-integer or past time stamp, fall back to a plain heap
+            self.q = Heap_Queue(self.q.events())
+            self.q.push(e)
 
-    @staticmethod
-    def Get_Earliest():
-        if Event_Queue.q == []:
+    def Get_Earliest(self):
+        e = self.q.pop()
+        if e is None:
             return None
-        e = heapq.heappop(Event_Queue.q)
-        Event_Queue.Current_Time = e.time_stamp
+        self.Current_Time = e.time_stamp
+        self.Events_Popped += 1
         return e
 
-    @staticmethod
-    def Str():
+    def Has_Events_At(self, time_stamp):
+        return self.q.has_events_at(time_stamp)
+
+    def Size(self):
+        return len(self.q)
+
+    def Str(self):
         ans = ""
-        for i in Event_Queue.q:
+        for i in self.q.events():
             ans += str(i)
             ans += "\n"
         return ans
 
-    @staticmethod
-    def Get_Current_Time():
-        return Event_Queue.Current_Time
+    def Get_Current_Time(self):
+        return self.Current_Time
@@ -0,0 +1,24 @@
+import dataclasses
+
+
+# Routing messages are either strings or immutable structured payloads: tuples (named
+# tuples included), frozensets and frozen dataclasses, built from the types below.
+# They are handed to the receivers by reference, so the same object reaches every
+# neighbor.  With --check-messages the simulator checks each payload when it is sent.
+IMMUTABLE_TYPES = (str, bytes, int, float, complex, bool, type(None))
+
+
+def check_immutable(m):
+    if isinstance(m, IMMUTABLE_TYPES):
+        return
+    if isinstance(m, (tuple, frozenset)):
+        for item in m:
+            check_immutable(item)
+        return
+    if dataclasses.is_dataclass(m) and not isinstance(m, type):
+        if not m.__dataclass_params__.frozen:
+            raise TypeError("routing message contains a dataclass that is not frozen: %s" % type(m).__name__)
+        for field in dataclasses.fields(m):
+            check_immutable(getattr(m, field.name))
+        return
+    raise TypeError("routing message contains a mutable %s, nodes could share it" % type(m).__name__)
@@ -4,6 +4,8 @@ class Node:
     def __init__(self, id):
         self.id = id
         self.neighbors = []
+        self.sim = None  # set by the simulator that owns this node
+        self.area = 0
         self.logging = logging.getLogger('Node %d' % self.id)
 
     def __str__(self):
@@ -12,7 +14,9 @@ class Node:
     def link_has_been_updated(self, neighbor, latency):
         pass
 
-    def process_incoming_routing_message(self, m: str):
+    # m is whatever the sender passed to send_to_neighbors / send_to_neighbor: a string, or an
+    # immutable structured payload that every receiver gets by reference
+    def process_incoming_routing_message(self, m):
         pass
 
     def get_next_hop(self, destination):
@@ -21,17 +25,28 @@ class Node:
     def get_routing_table(self):
         pass
 
-    def send_to_neighbors(self, message: str):
-        from simulator.topology import Send_To_Neighbors
-        Send_To_Neighbors(self, message)
+    def area_has_been_updated(self, area):
+        self.area = area
 
-    def send_to_neighbor(self, neighbor, message: str):
-        from simulator.topology import Send_To_Neighbor
-        Send_To_Neighbor(self, neighbor, message)
+    # Called once after the last event of the current time, if request_end_of_tick was called during it
+    def end_of_tick(self):
+        pass
+
+    def request_end_of_tick(self):
+        self.sim.request_end_of_tick(self)
+
+    # Number of routing entries the node keeps, reported at the end of a run
+    def database_size(self):
+        return 0
+
+    def send_to_neighbors(self, message):
+        self.sim.send_to_neighbors(self.id, message)
+
+    def send_to_neighbor(self, neighbor, message):
+        self.sim.send_to_neighbor(self.id, neighbor, message)
 
     def get_time(self):
-        from simulator.topology import Get_Time
-        return Get_Time()
+        return self.sim.get_time()
 
 
 class Link:
@@ -0,0 +1,107 @@
+import json
+import time
+
+from simulator.event import Event
+
+
+# Opt-in instrumentation of a run.  Nothing here is touched unless Sim is created with
+# profile=True; then the event queue's Post / Get_Earliest, Event.dispatch and the node
+# callbacks are replaced by timed wrappers on the instances.
+# Timed calls nest: every frame knows the path of frames it runs in and adds its self
+# time (its own time minus that of its children) to that path, which is the collapsed
+# stack format read by flamegraph.pl and speedscope.
+NODE_CALLBACKS = ('link_has_been_updated', 'process_incoming_routing_message', 'get_next_hop', 'end_of_tick')
+
+ROOT = 'sim'
+
+
+class Profiler:
+    # Queue size is sampled every SAMPLE_EVERY events
+    SAMPLE_EVERY = 1000
+
+    def __init__(self):
+        self.stack = [[ROOT, 0.0]]  # open frames as [path, time of finished children]
+        self.collapsed = {}  # path -> self time
+        self.events = {}  # event type -> [count, time]
+        self.queue_calls = {}  # event queue method -> [count, time]
+        self.callbacks = {}  # node callback -> [count, time]
+        self.node_time = {}  # node id -> time inside its callbacks
+        self.queue_sizes = []  # [events dispatched, simulated time, queued events]
+        self.dispatched = 0
+        self.sim = None
+        self.start = self.end = None
+
+    def attach(self, sim):
+        self.sim = sim
+        self.start = time.perf_counter()
+        queue = sim.event_queue
+        for name in ('Post', 'Get_Earliest'):
+            self.wrap(queue, name, 'event_queue.' + name, self.queue_calls)
+
+    def stop(self):
+        self.end = time.perf_counter()
+
+    def instrument(self, node):
+        for name in NODE_CALLBACKS:
+            self.wrap(node, name, name, self.callbacks, node.id)
+
+    def wrap(self, obj, attribute, name, stats, node_id=None):
+        method = getattr(obj, attribute)
+
+        def timed(*args):
+            return self.timed(name, stats, method, args, node_id)
+        setattr(obj, attribute, timed)
+
+    def timed(self, name, stats, fn, args, node_id=None):
+        stack = self.stack
+        frame = [stack[-1][0] + ';' + name, 0.0]
+        stack.append(frame)
+        start = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            stack.pop()
+            stack[-1][1] += elapsed
+            path = frame[0]
+            self.collapsed[path] = self.collapsed.get(path, 0.0) + elapsed - frame[1]
+            counts = stats.get(name)
+            if counts is None:
+                counts = stats[name] = [0, 0.0]
+            counts[0] += 1
+            counts[1] += elapsed
+            if node_id is not None:
+                self.node_time[node_id] = self.node_time.get(node_id, 0.0) + elapsed
+
+    def dispatch(self, e):
+        self.dispatched += 1
+        if self.dispatched % self.SAMPLE_EVERY == 0:
+            self.queue_sizes.append([self.dispatched, e.time_stamp, self.sim.event_queue.Size()])
+        self.timed(e.event_type, self.events, Event.dispatch, (e,))
+
+    def report(self):
+        def table(stats):
+            return {name: {'count': count, 'time': total} for name, (count, total) in
+                    sorted(stats.items(), key=lambda item: -item[1][1])}
+        return {
+            'wall_time': (self.end or time.perf_counter()) - self.start,
+            'events_dispatched': self.dispatched,
+            'events': table(self.events),
+            'event_queue': table(self.queue_calls),
+            'callbacks': table(self.callbacks),
+            'node_time': sorted(([node, total] for node, total in self.node_time.items()), key=lambda item: -item[1]),
+            'queue_size': self.queue_sizes,
+        }
+
+    def write(self, prefix):
+        report = self.report()
+        with open(prefix + '.json', 'w') as f:
+            json.dump(report, f, indent=2)
+        collapsed = dict(self.collapsed)
+        # whatever ran outside any timed frame: the dispatch loop itself, end of tick checks
+        collapsed[ROOT] = report['wall_time'] - self.stack[0][1]
+        with open(prefix + '.collapsed', 'w') as f:
+            for path, total in sorted(collapsed.items()):
+                # microseconds, flamegraph.pl wants integers
+                if int(total * 1e6) > 0:
+                    f.write('%s %d\n' % (path, int(total * 1e6)))
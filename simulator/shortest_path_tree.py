@@ -0,0 +1,135 @@
+import heapq
+
+
+class Shortest_Path_Tree:
+    # Shortest path tree from one source over an undirected adjacency dict
+    # (node -> {neighbor: cost}).  Whoever owns adj changes it first and then calls
+    # update_link, which repairs only the part of the tree the change can affect:
+    # a cheaper or new link relaxes outward from its endpoints, a dearer or removed
+    # tree link re-attaches the subtree hanging below it.  Unreachable nodes have no dist.
+
+    def __init__(self, adj, source):
+        self.adj = adj
+        self.source = source
+        self.rebuild()
+
+    def rebuild(self):
+        self.dist = {self.source: 0}
+        self.pred = {self.source: None}
+        self.children = {self.source: set()}
+        self.first_hop = {}
+        self.propagate([(0, self.source)])
+
+    def propagate(self, heap):
+        # Dijkstra from nodes whose dist has just been lowered
+        dist, adj = self.dist, self.adj
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbor, cost in adj[node].items():
+                nd = d + cost
+                if nd < dist.get(neighbor, float('inf')):
+                    dist[neighbor] = nd
+                    self.set_parent(neighbor, node)
+                    heapq.heappush(heap, (nd, neighbor))
+
+    def set_parent(self, node, parent):
+        old = self.pred.get(node)
+        if old is not None:
+            self.children[old].discard(node)
+        self.pred[node] = parent
+        self.children.setdefault(parent, set()).add(node)
+        self.forget_first_hops(node)
+
+    def forget_first_hops(self, node):
+        # a node without a cached first hop has no cached descendants either
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            if self.first_hop.pop(node, None) is not None:
+                stack.extend(self.children.get(node, ()))
+
+    def subtree(self, root):
+        nodes, stack = [], [root]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            stack.extend(self.children.get(node, ()))
+        return nodes
+
+    def update_link(self, node1, node2, old_cost, new_cost):
+        # old_cost is None for a new link, new_cost is None for a removed one
+        if old_cost is None or (new_cost is not None and new_cost < old_cost):
+            self.link_decreased(node1, node2, new_cost)
+        elif new_cost is None or new_cost > old_cost:
+            self.link_increased(node1, node2)
+
+    def link_decreased(self, node1, node2, cost):
+        heap = []
+        for a, b in ((node1, node2), (node2, node1)):
+            if a in self.dist and self.dist[a] + cost < self.dist.get(b, float('inf')):
+                self.dist[b] = self.dist[a] + cost
+                self.set_parent(b, a)
+                heapq.heappush(heap, (self.dist[b], b))
+        self.propagate(heap)
+
+    def link_increased(self, node1, node2):
+        if self.pred.get(node2) == node1:
+            root = node2
+        elif self.pred.get(node1) == node2:
+            root = node1
+        else:
+            return  # not a tree link, no distance depends on it
+
+        self.forget_first_hops(root)
+        self.children[self.pred[root]].discard(root)
+        detached = self.subtree(root)
+        for node in detached:
+            del self.dist[node]
+            del self.pred[node]
+            self.children.pop(node, None)
+
+        # re-attach each detached node through its best neighbor outside the subtree
+        heap = []
+        for node in detached:
+            best, parent = float('inf'), None
+            for neighbor, cost in self.adj[node].items():
+                if neighbor in self.dist and self.dist[neighbor] + cost < best:
+                    best, parent = self.dist[neighbor] + cost, neighbor
+            if parent is not None:
+                self.dist[node] = best
+                self.set_parent(node, parent)
+                heapq.heappush(heap, (best, node))
+        self.propagate(heap)
+
+    def get_first_hop(self, destination):
+        if destination not in self.dist or destination == self.source:
+            return None
+        walk, node = [], destination
+        while node not in self.first_hop and self.pred[node] != self.source:
+            walk.append(node)
+            node = self.pred[node]
+        hop = self.first_hop.get(node, node)
+        self.first_hop[node] = hop
+        for node in walk:
+            self.first_hop[node] = hop
+        return hop
+
+    def path(self, destination):
+        ans = [destination]
+        while ans[-1] != self.source:
+            ans.append(self.pred[ans[-1]])
+        ans.reverse()
+        return ans
+
+    def paths(self):
+        # path from the source to every reachable node, built top-down over the tree
+        ans = {self.source: [self.source]}
+        stack = [self.source]
+        while stack:
+            node = stack.pop()
+            for child in self.children.get(node, ()):
+                ans[child] = ans[node] + [child]
+                stack.append(child)
+        return ans
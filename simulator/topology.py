@@ -1,44 +1,105 @@
 import sys
+import random
 import logging
 import traceback
 import time
 import networkx as nx
-import matplotlib.pyplot as plt
 
 from simulator.config import *
 from simulator.event import Event
 from simulator.event_queue import Event_Queue
+from simulator.message import check_immutable
+from simulator.codec import CODECS
+from simulator.shortest_path_tree import Shortest_Path_Tree
+from simulator.verify import verify_routes
 
 
-class Topology:
+class In_Flight:
+    # Handle of one message on its way over a link, used to cancel it when the link goes away
+    __slots__ = ('link', 'cancelled')
+
+    def __init__(self, link):
+        self.link = link
+        self.cancelled = False
+
+    def __repr__(self):
+        # shown in the event args by DUMP_SIM and SINGLE_STEP
+        return "In_Flight(%d, %d%s)" % (self.link + (", cancelled" if self.cancelled else "",))
+
+
+def link_key(node1, node2):
+    return (node1, node2) if node1 <= node2 else (node2, node1)
 
-    Nodes = {}
-    this = None
 
-    def __init__(self, algorithm, step='NORMAL'):
-        self.__g = nx.Graph()
+class Topology:
+
+    def __init__(self, algorithm, step='NORMAL', render=True, drop_in_flight=False, check_messages=False, codec='none'):
+        self.adj = {}  # node -> {neighbor: latency}
+        self.__g = None  # networkx copy of adj, only built for drawing
+        self.oracle = {}  # source -> Shortest_Path_Tree, in least recently used order
+        self.user_routes = {}  # destination -> {node: (next hop, path length)}, until anything changes
+        self.nodes = {}
+        self.shared = {}  # state the nodes of this simulation share, by name
+        self.event_queue = Event_Queue()
         self.node_cls = ROUTE_ALGORITHM_NODE[algorithm]
         self.step = step
+        self.render = render
+        self.checks = []  # results of DRAW_PATH / DRAW_TREE / VERIFY_*
         self.logging = logging.getLogger('Sim')
         self.position = None
         self.message_count = 0
+        self.sent_count = 0  # copies of messages put on links, delivered, dropped or still in flight
+        self.byte_count = 0  # length of the delivered string messages, or of every message with a codec
+        self.unsized_count = 0  # delivered messages byte_count could not measure: structured, without a codec
+        self.end_of_tick_nodes = {}  # node id -> node to call end_of_tick on, in order of request
+        # when set, messages still on a link that is deleted are dropped instead of delivered
+        self.drop_in_flight = drop_in_flight
+        self.in_flight = {}  # link_key -> set of In_Flight handles
+        self.dropped_count = 0
+        # when set, every structured message is checked to be immutable when it is sent
+        self.check_messages = check_messages
+        # when set, messages go over the links encoded, and the bytes sent are counted
+        self.codec = CODECS[codec]() if codec != 'none' else None
+        self.convergence = None  # Convergence_Tracker, set by Sim when convergence is tracked
+        self.profiler = None  # Profiler, set by Sim when the run is profiled
+        self.type_bytes = {}  # message type -> [copies sent, bytes sent]
+        self.link_bytes = {}  # link_key -> bytes sent over the link, both ways
         self.print_count = 0
-        Topology.Nodes = {}
-        Topology.this = self
 
     def __str__(self):
         ans = ""
-        for node in self.__g.nodes:
+        for node, neighbors in self.adj.items():
             ans += "node " + str(node) + ": "
-            ans += str(self.__g[node])
+            ans += str({neighbor: {'latency': latency} for neighbor, latency in neighbors.items()})
             ans += "\n"
         return ans
 
+    def get_time(self):
+        return self.event_queue.Current_Time
+
+    def graph(self):
+        if self.__g is None:
+            self.__g = nx.Graph()
+            self.__g.add_nodes_from(self.adj)
+            for node, neighbors in self.adj.items():
+                for neighbor, latency in neighbors.items():
+                    self.__g.add_edge(node, neighbor, latency = latency)
+        return self.__g
+
+    def has_link(self, node1, node2):
+        return node1 in self.adj and node2 in self.adj[node1]
+
     def add_node(self, node):
-        if node not in Topology.Nodes.keys():
+        if node not in self.nodes.keys():
             self.position = None
-            Topology.Nodes[node] = self.node_cls(node)
-        self.__g.add_node(node)
+            self.nodes[node] = self.node_cls(node)
+            self.nodes[node].sim = self
+            if self.profiler is not None:
+                self.profiler.instrument(self.nodes[node])
+        if node not in self.adj:
+            self.adj[node] = {}
+            self.__g = None
+            self.user_routes.clear()
 
     def add_link(self, node1, node2, latency):
         if latency < 0:
@@ -46,7 +107,12 @@ class Topology:
             sys.exit(-1)
         self.add_node(node1)
         self.add_node(node2)
-        self.__g.add_edge(node1, node2, latency = latency)
+        old_latency = self.adj[node1].get(node2)
+        self.adj[node1][node2] = latency
+        self.adj[node2][node1] = latency
+        self.__g = None
+        self.user_routes.clear()
+        self.update_oracle(node1, node2, old_latency, latency)
         self.post_send_link(node1, node2, latency)
         self.post_send_link(node2, node1, latency)
 
@@ -54,14 +120,17 @@ class Topology:
         self.add_link(node1, node2, latency)
 
     def send_link(self, node, neighbor, latency):
-        if node not in Topology.Nodes:
+        if node not in self.nodes:
             return
-        Topology.Nodes[node].link_has_been_updated(neighbor, latency)
+        self.user_routes.clear()
+        if self.convergence is not None:
+            self.convergence.touch(node)
+        self.nodes[node].link_has_been_updated(neighbor, latency)
 
     def post_send_link(self, node, neighbor, latency):
-        Event_Queue.Post(
+        self.event_queue.Post(
             Event(
-                Get_Time(),
+                self.get_time(),
                 EVENT_TYPE.SEND_LINK,
                 self,
                 node,
@@ -71,122 +140,277 @@ class Topology:
         )
 
     def delete_link(self, node1, node2):
-        if (node1, node2) in self.__g.edges:
-            self.__g.remove_edge(node1, node2)
+        if self.has_link(node1, node2):
+            old_latency = self.adj[node1].pop(node2)
+            del self.adj[node2][node1]
+            self.__g = None
+            self.user_routes.clear()
+            self.update_oracle(node1, node2, old_latency, None)
+            if self.drop_in_flight:
+                self.cancel_in_flight(node1, node2)
             self.post_send_link(node1, node2, -1)
             self.post_send_link(node2, node1, -1)
         else:
             self.logging.warning("remove link (%d, %d) does not exit" % (node1, node2))
 
     def delete_node(self, node):
-        if node in self.__g.nodes:
-            for neighbor in list(self.__g[node].keys()):
+        if node in self.adj:
+            for neighbor in list(self.adj[node].keys()):
                 self.delete_link(node, neighbor)
-            self.__g.remove_node(node)
-            Topology.Nodes.pop(node)
+            del self.adj[node]
+            self.__g = None
+            self.user_routes.clear()
+            self.oracle.pop(node, None)
+            self.nodes.pop(node)
             self.position = None
-            self.logging.debug("node %d deleted at time %d" % (node, Get_Time()))
+            self.logging.debug("node %d deleted at time %d" % (node, self.get_time()))
         else:
             self.logging.warning("remove node %d does not exit" % node)
 
+    def set_area(self, node, area):
+        if node not in self.nodes:
+            self.logging.warning("node %d does not exit" % node)
+            return
+        self.user_routes.clear()
+        self.nodes[node].area_has_been_updated(area)
+
+    def request_end_of_tick(self, node):
+        self.end_of_tick_nodes[node.id] = node
+
+    def end_of_tick(self):
+        # Called by the dispatch loop after the last event of the current time.  Messages
+        # sent over zero latency links land in the same time, which then ends again.
+        nodes, self.end_of_tick_nodes = self.end_of_tick_nodes, {}
+        ran = False
+        for node_id, node in nodes.items():
+            if self.nodes.get(node_id) is node:
+                node.end_of_tick()
+                ran = True
+        if ran:
+            # a node may change its routes here, as on a message
+            self.user_routes.clear()
+
+    def busiest_link(self):
+        if not self.link_bytes:
+            return None, 0
+        return max(self.link_bytes.items(), key=lambda item: item[1])
+
+    def database_sizes(self):
+        return [node.database_size() for node in self.nodes.values()]
+
     def dump_node(self, node):
-        if (node in self.__g.nodes) and (node in Topology.Nodes.keys()):
-            self.logging.info('DUMP_NODE: ' + str(Topology.Nodes[node]))
+        if (node in self.adj) and (node in self.nodes.keys()):
+            self.logging.info('DUMP_NODE: ' + str(self.nodes[node]))
         else:
             self.logging.warning("node %d does not exit" % node)
 
     def send_to_neighbors(self, node, m):
-        for neighbor in list(self.__g[node].keys()):
-            self.send_to_neighbor(node, neighbor, m)
+        if self.check_messages:
+            check_immutable(m)
+        if self.codec is not None:
+            m = self.encode(node, m, self.adj[node])
+        self.sent_count += len(self.adj[node])
+        # one event per distinct arrival time, expanded into deliveries when it fires
+        arrivals = {}
+        for neighbor, latency in self.adj[node].items():
+            arrivals.setdefault(int(latency), []).append(neighbor)
+        for latency, neighbors in arrivals.items():
+            if len(neighbors) == 1:
+                self.event_queue.Post(Event(self.get_time() + latency, EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL,
+                                            self, neighbors[0], m, self.track(node, neighbors[0])))
+            else:
+                handles = tuple(self.track(node, neighbor) for neighbor in neighbors) if self.drop_in_flight else -1
+                self.event_queue.Post(Event(self.get_time() + latency, EVENT_TYPE.ROUTING_MESSAGE_FANOUT,
+                                            self, tuple(neighbors), m, handles))
 
     def send_to_neighbor(self, node, neighbor, m):
-        if (node, neighbor) not in self.__g.edges:
+        if self.check_messages:
+            check_immutable(m)
+        neighbors = self.adj.get(node)
+        if neighbors is None or neighbor not in neighbors:
             return
-        Event_Queue.Post(
+        if self.codec is not None:
+            m = self.encode(node, m, (neighbor,))
+        self.sent_count += 1
+        self.event_queue.Post(
             Event(
-                Get_Time() + int(self.__g[node][neighbor]['latency']),
+                self.get_time() + int(neighbors[neighbor]),
                 EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL,
                 self,
                 neighbor,
-                m
+                m,
+                self.track(node, neighbor)
             )
         )
 
-    def routing_message_arrival(self, neighbor, m):
+    def encode(self, node, m, neighbors):
+        data = self.codec.encode(m)
+        size = len(data)
+        counts = self.type_bytes.setdefault(self.codec.message_type(data), [0, 0])
+        counts[0] += len(neighbors)
+        counts[1] += size * len(neighbors)
+        for neighbor in neighbors:
+            link = link_key(node, neighbor)
+            self.link_bytes[link] = self.link_bytes.get(link, 0) + size
+        return data
+
+    def in_flight_count(self):
+        return self.sent_count - self.message_count - self.dropped_count
+
+    def track(self, node, neighbor):
+        if not self.drop_in_flight:
+            return -1
+        handle = In_Flight(link_key(node, neighbor))
+        self.in_flight.setdefault(handle.link, set()).add(handle)
+        return handle
+
+    def cancel_in_flight(self, node1, node2):
+        # lazy deletion: the events stay queued and are skipped when they fire
+        for handle in self.in_flight.pop(link_key(node1, node2), ()):
+            handle.cancelled = True
+            self.dropped_count += 1
+
+    def routing_message_arrival(self, neighbor, m, handle=-1):
+        if handle != -1:
+            if handle.cancelled:
+                return
+            self.in_flight[handle.link].discard(handle)
         self.message_count += 1
-        if neighbor in self.__g.nodes:
-            Topology.Nodes[neighbor].process_incoming_routing_message(m)
+        if self.codec is not None:
+            self.byte_count += len(m)
+            if neighbor in self.adj:
+                m = self.codec.decode(m)
+        elif type(m) is str:
+            self.byte_count += len(m)
+        else:
+            self.unsized_count += 1
+        if neighbor in self.adj:
+            self.user_routes.clear()
+            if self.convergence is not None:
+                self.convergence.touch(neighbor)
+            self.nodes[neighbor].process_incoming_routing_message(m)
+
+    def routing_message_fanout(self, neighbors, m, handles=-1):
+        if handles == -1:
+            for neighbor in neighbors:
+                self.routing_message_arrival(neighbor, m)
+        else:
+            for neighbor, handle in zip(neighbors, handles):
+                self.routing_message_arrival(neighbor, m, handle)
 
     def node_labels(self):
-        return {node : str(node) for node in self.__g.nodes}
+        return {node : str(node) for node in self.adj}
 
     def edge_labels(self):
-        return {(node1, node2) : self.__g[node1][node2]['latency'] for node1, node2 in self.__g.edges}
+        return {(node1, node2) : latency for node1, node2, latency in self.graph().edges(data='latency')}
 
     def draw_topology(self):
+        if not self.render:
+            return
+        import matplotlib.pyplot as plt
         if self.position == None:
-            self.position = nx.spring_layout(self.__g)
-        nx.draw_networkx_nodes(self.__g, self.position, node_size=600, node_color='b', alpha=0.7)
-        nx.draw_networkx_labels(self.__g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
-        nx.draw_networkx_edges(self.__g, self.position, width=2, alpha=0.5)
-        nx.draw_networkx_edge_labels(self.__g, self.position, edge_labels=self.edge_labels(), font_size=14)
+            self.position = nx.spring_layout(self.graph())
+        nx.draw_networkx_nodes(self.graph(), self.position, node_size=600, node_color='b', alpha=0.7)
+        nx.draw_networkx_labels(self.graph(), self.position, labels=self.node_labels(), font_size=14, font_color='w')
+        nx.draw_networkx_edges(self.graph(), self.position, width=2, alpha=0.5)
+        nx.draw_networkx_edge_labels(self.graph(), self.position, edge_labels=self.edge_labels(), font_size=14)
         plt.axis('off')
 
-        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(Get_Time()) + '.png'
+        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(self.get_time()) + '.png'
         self.print_count += 1
         plt.savefig(OUTPUT_PATH + filename) # call savefig before show
         plt.show()
         plt.close(OUTPUT_PATH + filename)
         self.wait()
 
+    def update_oracle(self, node1, node2, old_latency, new_latency):
+        for tree in self.oracle.values():
+            tree.update_link(node1, node2, old_latency, new_latency)
+
+    def shortest_path_tree(self, source):
+        tree = self.oracle.pop(source, None)
+        if tree is None:
+            tree = Shortest_Path_Tree(self.adj, source)
+            if len(self.oracle) >= ORACLE_CACHE_SIZE:
+                self.oracle.pop(next(iter(self.oracle)))  # least recently used
+        self.oracle[source] = tree
+        return tree
+
     def get_correct_path(self, source, destination):
-        try:
-            shortest_path = nx.algorithms.shortest_path(self.__g, source=source, target=destination, weight='latency')
-            shortest_length = nx.algorithms.shortest_path_length(self.__g, source=source, target=destination, weight='latency')
-        except:
+        tree = self.shortest_path_tree(source)
+        if destination not in tree.dist:
             self.logging.warning("No path from %d to %d, please correct event/topo file" % (source, destination))
             return None, float("inf")
-        return shortest_path, shortest_length
+        return tree.path(destination), tree.dist[destination]
 
 
     def get_correct_path_dict(self, source):
-        try:
-            shortest_paths = nx.algorithms.shortest_path(self.__g, source=source, weight='latency')
-            shortest_lengths = nx.algorithms.shortest_path_length(self.__g, source=source, weight='latency')
-        except:
-            self.logging.warning("No Tree from %d, please correct event/topo file" % source)
-            return None, float("inf")
-        shortest_path_dict = {(source, k):v for (k,v) in shortest_paths.items() if source != k}
-        shortest_length_dict = {(source, k):v for (k,v) in shortest_lengths.items() if source != k}
+        tree = self.shortest_path_tree(source)
+        shortest_path_dict = {(source, k):v for (k,v) in tree.paths().items() if source != k}
+        shortest_length_dict = {(source, k):v for (k,v) in tree.dist.items() if source != k}
         return shortest_path_dict, shortest_length_dict
 
 
-    def get_user_path(self, source, destination):
-        path = [source]
-        length = 0
+    def resolve_user_routes(self, source, destination):
+        # Follows the nodes' next hops from source until the walk reaches a node whose
+        # route towards destination is already known, fails, or comes back onto itself,
+        # then records next hop and length for every node it went through.
+        routes = self.user_routes.get(destination)
+        if routes is None:
+            routes = self.user_routes[destination] = {destination: (None, 0)}
+        walk, on_walk = [], set()
+        node = source
+        while node not in routes:
+            if node in on_walk:
+                length = float("inf")
+                break
+            on_walk.add(node)
+            next = self.nodes[node].get_next_hop(destination)
+            walk.append((node, next))
+            if next == None or next == -1 or next not in self.adj or next not in self.adj[node]:
+                length = float("inf")
+                break
+            node = next
+        else:
+            length = routes[node][1]
+
+        for node, next in reversed(walk):
+            if length != float("inf"):
+                length += self.adj[node][next]
+            routes[node] = (next, length)
+        return routes
 
-        while destination not in path:
-            next = Topology.Nodes[path[-1]].get_next_hop(destination)
+    def get_user_path(self, source, destination):
+        routes = self.resolve_user_routes(source, destination)
+        if routes[source][1] != float("inf"):
+            path = [source]
+            while path[-1] != destination:
+                path.append(routes[path[-1]][0])
+            return path, routes[source][1]
+
+        # replay the broken walk from the recorded next hops to report where it fails
+        path, on_path = [source], {source}
+        while True:
+            next = routes[path[-1]][0]
             if next == None:
                 self.logging.warning("Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
                 return [], float("inf")
-            elif next == -1 or next not in self.__g.nodes or next in path:
+            elif next == -1 or next not in self.adj or next in on_path:
                 path.append(next)
                 self.logging.warning(
                     "Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
                 return [], float("inf")
-            elif (path[-1], next) not in self.__g.edges:
+            elif next not in self.adj[path[-1]]:
                 self.logging.warning("Link from %d to %d does not exist, you cannot use it" % (path[-1], next))
                 path.append(next)
                 return [], float("inf")
-            length += self.__g[path[-1]][next]['latency']
             path.append(next)
-        return path, length
+            on_path.add(next)
 
 
     def get_user_path_dict(self, source):
         path_dict, length_dict = {}, {}
-        for d in self.__g.nodes:
+        for d in self.adj:
             if d == source: continue
             path_dict[(source, d)], length_dict[(source, d)] = self.get_user_path(source, d)
         return path_dict, length_dict
@@ -194,7 +418,7 @@ class Topology:
 
 
     def draw_path(self, source, destination):
-        if (source not in self.__g.nodes) or  (destination not in self.__g.nodes) or (source == destination):
+        if (source not in self.adj) or  (destination not in self.adj) or (source == destination):
             self.logging.warning("Parameters in DRAW_PATH are illegal.")
             return
 
@@ -207,9 +431,12 @@ class Topology:
         print("correct_path: (length=%s) %s" % (correct_length, correct_path))
         print("student_path: (length=%s) %s" % (user_length, user_path))
         print("student's solution is %s!\n" % ("correct" if correct_length == user_length else "incorrect"))
+        self.record_check(EVENT_TYPE.DRAW_PATH, [source, destination], correct_length == user_length)
+        if not self.render:
+            return
 
         red_nodes = [source, destination]
-        blue_nodes = list(self.__g.nodes)
+        blue_nodes = list(self.adj)
         for node in red_nodes:
             blue_nodes.remove(node)
 
@@ -221,7 +448,7 @@ class Topology:
 
 
     def draw_tree(self, source):
-        if source not in self.__g.nodes:
+        if source not in self.adj:
             self.logging.warning("Parameter in DRAW_TREE is illegal.")
             return
 
@@ -238,9 +465,12 @@ class Topology:
             print("correct_path: (length=%s) %s" % (correct_length_dict[k], correct_path_dict[k]))
             print("student_path: (length=%s) %s" % (user_length_dict[k], user_path_dict[k]))
         print("student's solution is %s!\n" % ("correct" if correct_length_dict == user_length_dict else "incorrect"))
+        self.record_check(EVENT_TYPE.DRAW_TREE, [source], correct_length_dict == user_length_dict)
+        if not self.render:
+            return
 
         red_nodes = [source]
-        blue_nodes = list(self.__g.nodes)
+        blue_nodes = list(self.adj)
         blue_nodes.remove(source)
 
         correct_edges, user_edges = set(), set()
@@ -251,22 +481,50 @@ class Topology:
 
         self.draw_in_networkx(red_nodes, blue_nodes, correct_edges, user_edges)
 
+    def verify_all(self):
+        self.verify_routes(EVENT_TYPE.VERIFY_ALL, [], list(self.adj))
+
+    def verify_sample(self, k):
+        if k <= 0:
+            self.logging.warning("Parameter in VERIFY_SAMPLE is illegal.")
+            return
+        # seeded by the time stamp so a rerun checks the same destinations
+        nodes = sorted(self.adj)
+        destinations = random.Random(self.get_time()).sample(nodes, min(k, len(nodes)))
+        self.verify_routes(EVENT_TYPE.VERIFY_SAMPLE, [k], destinations)
+
+    def verify_routes(self, command, args, destinations):
+        checked, mismatches = verify_routes(self.adj, self.nodes, destinations)
+        print("checking all paths to %d destinations..." % len(destinations))
+        for source, destination, correct_length, user_length in mismatches[:VERIFY_MAX_REPORTED]:
+            print("from %s to %s: correct length=%g, student length=%g" % (source, destination, correct_length, user_length))
+        if len(mismatches) > VERIFY_MAX_REPORTED:
+            print("... and %d more" % (len(mismatches) - VERIFY_MAX_REPORTED))
+        print("%d of %d paths are correct" % (checked - len(mismatches), checked))
+        print("student's solution is %s!\n" % ("correct" if not mismatches else "incorrect"))
+        self.record_check(command, args, not mismatches)
+
+    def record_check(self, command, args, correct):
+        self.checks.append({'time': self.get_time(), 'command': command, 'args': args, 'correct': correct})
+
     def draw_in_networkx(self, red_nodes, blue_nodes, correct_path, user_path):
+        import matplotlib.pyplot as plt
+        g = self.graph()
         if self.position == None:
-            self.position = nx.spring_layout(self.__g)
+            self.position = nx.spring_layout(g)
             
-        nx.draw_networkx_nodes(self.__g, self.position, nodelist=blue_nodes, node_size=600, node_color='b', alpha=0.7)
-        nx.draw_networkx_nodes(self.__g, self.position, nodelist=red_nodes, node_size=700, node_color='r', alpha=0.6)
-        nx.draw_networkx_labels(self.__g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
+        nx.draw_networkx_nodes(g, self.position, nodelist=blue_nodes, node_size=600, node_color='b', alpha=0.7)
+        nx.draw_networkx_nodes(g, self.position, nodelist=red_nodes, node_size=700, node_color='r', alpha=0.6)
+        nx.draw_networkx_labels(g, self.position, labels=self.node_labels(), font_size=14, font_color='w')
 
-        nx.draw_networkx_edges(self.__g, self.position, width=2, alpha=0.5)
+        nx.draw_networkx_edges(g, self.position, width=2, alpha=0.5)
         if user_path != None:
-            nx.draw_networkx_edges(self.__g, self.position, edgelist=user_path, width=6, edge_color='r', alpha=0.4)
-        nx.draw_networkx_edges(self.__g, self.position, edgelist=correct_path, width=3, edge_color='g', alpha=0.8)
-        nx.draw_networkx_edge_labels(self.__g, self.position, edge_labels=self.edge_labels(), font_size=14)
+            nx.draw_networkx_edges(g, self.position, edgelist=user_path, width=6, edge_color='r', alpha=0.4)
+        nx.draw_networkx_edges(g, self.position, edgelist=correct_path, width=3, edge_color='g', alpha=0.8)
+        nx.draw_networkx_edge_labels(g, self.position, edge_labels=self.edge_labels(), font_size=14)
         plt.axis('off')
 
-        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(Get_Time()) + '.png'
+        filename = 'Topo_' + time.strftime("%H_%M_%S", time.localtime()) + '_Count_' + str(self.print_count) + '_Time_' + str(self.get_time()) + '.png'
         self.print_count += 1
         plt.savefig(OUTPUT_PATH + filename)  # call savefig before show
         plt.show()
@@ -292,18 +550,18 @@ class Topology:
 
                 num_args = len(items) - 2
                 if event_type == EVENT_TYPE.PRINT:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, "".join(items[2:])))
+                    self.event_queue.Post(Event(time_stamp, event_type, self, "".join(items[2:])))
                 elif num_args < 0 or num_args > 3:
                     sys.stderr.write(line)
                     raise BufferError
                 elif num_args == 0:
-                    Event_Queue.Post(Event(time_stamp, event_type, self))
+                    self.event_queue.Post(Event(time_stamp, event_type, self))
                 elif num_args == 1:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2])))
+                    self.event_queue.Post(Event(time_stamp, event_type, self, int(items[2])))
                 elif num_args == 2:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3])))
+                    self.event_queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3])))
                 elif num_args == 3:
-                    Event_Queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3]), int(items[4])))
+                    self.event_queue.Post(Event(time_stamp, event_type, self, int(items[2]), int(items[3]), int(items[4])))
             f.close()
 
         except IOError as e:
@@ -320,13 +578,3 @@ class Topology:
             print(e)
             traceback.print_exc()
             sys.exit(-1)
-
-
-def Send_To_Neighbors(node, m):
-    Topology.this.send_to_neighbors(node.id, m)
-
-def Send_To_Neighbor(node, neighbor, m):
-    Topology.this.send_to_neighbor(node.id, neighbor, m)
-
-def Get_Time():
-    return Event_Queue.Current_Time
@@ -0,0 +1,140 @@
+import heapq
+import math
+
+import numpy as np
+
+
+# Batched route checking for VERIFY_ALL / VERIFY_SAMPLE.
+# Nodes get dense ids 0..n-1, and destinations are handled in blocks of CHUNK columns:
+# true distances come from a vectorized Bellman-Ford over the edge arrays, or from one
+# Dijkstra per destination when the block has few destinations for the size of the
+# network, and the nodes' next hops are followed for every source at once by pointer
+# doubling.
+CHUNK = 256
+# Bellman-Ford runs once per hop of the longest shortest path, each pass over every
+# edge of every destination of the block.  With fewer destinations than nodes /
+# DIJKSTRA_RATIO, a Dijkstra per destination is cheaper.
+DIJKSTRA_RATIO = 32
+
+
+class Dense_Topology:
+    def __init__(self, adj):
+        self.nodes = list(adj)
+        self.index = {node: i for i, node in enumerate(self.nodes)}
+        n = len(self.nodes)
+
+        src, dst, cost = [], [], []
+        for node, neighbors in adj.items():
+            for neighbor, latency in neighbors.items():
+                src.append(self.index[node])
+                dst.append(self.index[neighbor])
+                cost.append(latency)
+        src = np.array(src, dtype=np.int64)
+        dst = np.array(dst, dtype=np.int64)
+        cost = np.array(cost, dtype=np.float64)
+
+        # directed edges grouped by head, for the min-reduction in distances()
+        order = np.argsort(dst, kind='stable')
+        self.src, self.dst, self.cost = src[order], dst[order], cost[order]
+        self.heads, self.starts = np.unique(self.dst, return_index=True)
+
+        # edge weights looked up by the key tail * n + head
+        keys = src * n + dst
+        order = np.argsort(keys)
+        self.keys, self.key_cost = keys[order], cost[order]
+        self.adjacency = None  # built on the first Dijkstra
+
+    def distances(self, targets):
+        # dist[j, i] = shortest distance between node i and targets[j] (links are undirected)
+        n = len(self.nodes)
+        if len(targets) * DIJKSTRA_RATIO <= n:
+            return np.array([self.dijkstra(target) for target in targets]).reshape(len(targets), n)
+        dist = np.full((len(targets), n), np.inf)
+        dist[np.arange(len(targets)), targets] = 0
+        if len(self.src) == 0:
+            return dist
+        while True:
+            candidates = dist[:, self.src] + self.cost
+            best = np.minimum.reduceat(candidates, self.starts, axis=1)
+            improved = best < dist[:, self.heads]
+            if not improved.any():
+                return dist
+            dist[:, self.heads] = np.minimum(dist[:, self.heads], best)
+
+    def dijkstra(self, target):
+        if self.adjacency is None:
+            self.adjacency = [[] for _ in self.nodes]
+            for tail, head, cost in zip(self.src.tolist(), self.dst.tolist(), self.cost.tolist()):
+                self.adjacency[head].append((tail, cost))
+        dist = [math.inf] * len(self.nodes)
+        dist[target] = 0
+        heap = [(0, target)]
+        while heap:
+            d, node = heapq.heappop(heap)
+            if d > dist[node]:
+                continue
+            for neighbor, cost in self.adjacency[node]:
+                if d + cost < dist[neighbor]:
+                    dist[neighbor] = d + cost
+                    heapq.heappush(heap, (d + cost, neighbor))
+        return dist
+
+    def link_cost(self, tails, heads):
+        # cost of each tail -> head link, inf where there is no such link
+        ans = np.full(heads.shape, np.inf)
+        if len(self.keys) == 0:
+            return ans
+        keys = tails * len(self.nodes) + heads
+        pos = np.searchsorted(self.keys, keys).clip(max=len(self.keys) - 1)
+        found = (heads >= 0) & (self.keys[pos] == keys)
+        ans[found] = self.key_cost[pos[found]]
+        return ans
+
+
+def next_hop_table(dense, nodes, targets):
+    # hops[i, j] = dense id of nodes[i].get_next_hop(targets[j]), -1 when unusable
+    n = len(dense.nodes)
+    hops = np.empty((n, len(targets)), dtype=np.int64)
+    target_ids = [dense.nodes[target] for target in targets]
+    index = dense.index.get
+    for i, node in enumerate(dense.nodes):
+        get_next_hop = nodes[node].get_next_hop
+        hops[i] = [i if target == node else index(get_next_hop(target), -1) for target in target_ids]
+    return hops
+
+
+def user_lengths(dense, hops, targets):
+    # Length of the path each source gets by following next hops, inf if it never arrives.
+    # A dead node n absorbs every broken route.
+    n, k = hops.shape
+    cols = np.arange(k)
+    tails = np.repeat(np.arange(n), k).reshape(n, k)
+    length = dense.link_cost(tails, hops)
+    length[targets, cols] = 0
+    hop = np.where(np.isinf(length), n, hops)
+
+    hop = np.vstack([hop, np.full((1, k), n, dtype=np.int64)])
+    length = np.vstack([length, np.full((1, k), np.inf)])
+    for _ in range(max(1, math.ceil(math.log2(n + 1)))):
+        length = length + length[hop, cols]
+        hop = hop[hop, cols]
+    return np.where(hop[:n] == targets, length[:n], np.inf)
+
+
+def verify_routes(adj, nodes, destinations):
+    # Returns the number of (source, destination) pairs checked and the
+    # mismatches as (source, destination, correct_length, user_length).
+    dense = Dense_Topology(adj)
+    checked, mismatches = 0, []
+    destinations = [dense.index[d] for d in destinations]
+    for start in range(0, len(destinations), CHUNK):
+        targets = np.array(destinations[start:start + CHUNK], dtype=np.int64)
+        correct = dense.distances(targets).T
+        user = user_lengths(dense, next_hop_table(dense, nodes, targets), targets)
+
+        reachable = np.isfinite(correct)
+        reachable[targets, np.arange(len(targets))] = False
+        checked += int(reachable.sum())
+        for i, j in zip(*np.nonzero(reachable & (user != correct))):
+            mismatches.append((dense.nodes[i], dense.nodes[targets[j]], correct[i, j], user[i, j]))
+    return checked, mismatches
@@ -0,0 +1,39 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from area_link_state_node import Area_Link_State_Node
+from sim import Sim
+
+
+# Three areas of six nodes, with a border link deleted, a node moving to another area and
+# a second border link deleted.  No shortest path of the scenario leaves an area and
+# comes back into it, so LINK_STATE_AREA must get every tree right, while each node
+# keeps less than the whole topology.
+EVENT_FILE = os.path.join(ROOT, 'adversarial_cases', 'areas.event')
+
+
+def run(algorithm, codec='none'):
+    return Sim(algorithm, EVENT_FILE, 'NO_STOP', render=False, codec=codec)
+
+
+def mean_database_size(s):
+    sizes = s.database_sizes()
+    return sum(sizes) / len(sizes)
+
+
+@pytest.mark.parametrize('codec', ['none', 'binary'])
+@pytest.mark.parametrize('coalesce', [True, False])
+def test_trees(monkeypatch, coalesce, codec):
+    monkeypatch.setattr(Area_Link_State_Node, 'COALESCE', coalesce)
+    s = run('LINK_STATE_AREA', codec)
+    assert [c['command'] for c in s.checks] == ['DRAW_TREE'] * 10 + ['VERIFY_ALL']
+    assert all(c['correct'] for c in s.checks)
+
+
+def test_database_smaller_than_router_lsa():
+    assert mean_database_size(run('LINK_STATE_AREA')) < mean_database_size(run('LINK_STATE_ROUTER_LSA'))
@@ -0,0 +1,120 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from area_link_state_node import Area_LSA_Update, Area_Summary, Area_Vector
+from distance_vector_node import Distance_Vector_Message, Incremental_Update, Table_Request
+from link_state_node import Link_Record, Link_State_Update
+from numpy_distance_vector_node import Numpy_Distance_Vector_Message
+from router_lsa_node import Router_LSA, Router_LSA_Update
+from sequenced_distance_vector_node import Sequenced_Update
+from sim import Sim
+from simulator.codec import Binary_Codec, pack_ints, unpack_ints
+from simulator.config import ROUTE_ALGORITHM
+
+
+# The binary codec must give back every message as it was sent, whatever the size of the
+# costs, and a run must see the same routes and messages with and without it.
+INT32_MAX, INT32_MIN = 2 ** 31 - 1, -2 ** 31
+INT64_MAX, INT64_MIN = 2 ** 63 - 1, -2 ** 63
+
+# latencies past the 32-bit limit, and path costs that add up past it
+BIG_LATENCIES = """0 ADD_NODE 1
+0 ADD_NODE 2
+0 ADD_NODE 3
+0 ADD_NODE 4
+1 ADD_LINK 1 2 3000000000
+1 ADD_LINK 2 3 3000000000
+1 ADD_LINK 3 4 5
+1 ADD_LINK 1 4 7000000000
+20000000000 DRAW_TREE 1
+20000000001 CHANGE_LINK 1 2 1500000000
+40000000000 DRAW_TREE 4
+"""
+
+
+@pytest.mark.parametrize('values, width', [
+    ([], 4),
+    ([0, 1, -1], 4),
+    ([INT32_MAX, INT32_MIN], 4),
+    ([INT32_MAX + 1], 8),
+    ([INT32_MIN - 1], 8),
+    ([3000000000, 7], 8),
+    ([INT64_MAX, INT64_MIN], 8),
+])
+def test_pack_ints_round_trip(values, width):
+    data = pack_ints(values)
+    assert data[0] == width
+    assert len(data) == 1 + width * len(values)
+    assert unpack_ints(b'\x07' + data, 1) == tuple(values)
+
+
+@pytest.mark.parametrize('value', [INT64_MAX + 1, INT64_MIN - 1])
+def test_pack_ints_too_large(value):
+    with pytest.raises(ValueError):
+        pack_ints([1, value])
+
+
+def numpy_message(costs, paths):
+    return Numpy_Distance_Vector_Message(3, 9, np.array(costs, dtype=np.float64).tobytes(),
+                                         np.array(paths, dtype='<i4').tobytes())
+
+
+@pytest.mark.parametrize('m', [
+    'plain string',
+    Link_State_Update((Link_Record(1, 2, 5, 1), Link_Record(2, 1, float('inf'), 2))),
+    Link_State_Update((Link_Record(1, 2, INT32_MAX, 1), Link_Record(2, 3, 3000000000, INT32_MAX + 1))),
+    Distance_Vector_Message(1, 4, ((1, 0, (1,)), (2, 7, (1, 2)))),
+    Distance_Vector_Message(1, 4, ((2, INT32_MAX + 1, (1, 2)), (3, 6000000000, (1, 2, 3)))),
+    numpy_message([0, 4, np.inf], [[1, -1], [1, 2], [-1, -1]]),
+    numpy_message([0, 3000000000, 2 ** 53], [[1, -1], [1, 2], [1, 3]]),
+    Incremental_Update(1, 2, True, ((3, 4, (1, 3)), (5, INT32_MAX + 1, (1, 2, 5))), ()),
+    Incremental_Update(1, 3, False, (), (7, 8)),
+    Table_Request(9),
+    Sequenced_Update(1, 2, False, ((3, 4, None), (5, 6, 3000000000))),
+    Router_LSA_Update(1, (Router_LSA(1, 3, ((2, 5), (3, INT32_MAX + 1))), Router_LSA(2, 1, ()))),
+    Router_LSA_Update(1, ()),
+    Area_LSA_Update(1, 2, (Router_LSA(1, 3, ((2, 5),)),), (Area_Summary(4, 5, ((6, 7, (2, 3)),)), Area_Summary(8, 1, ()))),
+    Area_LSA_Update(1, 2, (), ()),
+    Area_Vector(1, 2, ((3, 4, (1,)), (5, 3000000000, (1, 2)))),
+], ids=lambda m: type(m).__name__)
+def test_schema_round_trip(m):
+    codec = Binary_Codec()
+    data = codec.encode(m)
+    assert codec.message_type(data) == type(m).__name__
+    assert codec.decode(data) == m
+
+
+def test_cost_too_large():
+    with pytest.raises(ValueError):
+        Binary_Codec().encode(Link_State_Update((Link_Record(1, 2, 2 ** 64, 1),)))
+
+
+def run(algorithm, event_file, codec):
+    return Sim(algorithm, event_file, 'NO_STOP', render=False, codec=codec)
+
+
+@pytest.fixture(scope='module')
+def big_latencies(tmp_path_factory):
+    path = tmp_path_factory.mktemp('codec') / 'big_latencies.event'
+    path.write_text(BIG_LATENCIES)
+    return str(path)
+
+
+@pytest.mark.parametrize('algorithm', ROUTE_ALGORITHM)
+@pytest.mark.parametrize('event_file', ['testing_suite/case_3.event', 'testing_suite/case_7.event',
+                                        'testing_suite/case_9.event', 'adversarial_cases/island_link.event',
+                                        'big_latencies'])
+def test_codec_matches_plain(algorithm, event_file, big_latencies):
+    event_file = big_latencies if event_file == 'big_latencies' else os.path.join(ROOT, event_file)
+    binary, plain = run(algorithm, event_file, 'binary'), run(algorithm, event_file, 'none')
+    assert binary.checks == plain.checks
+    assert binary.message_count == plain.message_count
+    if algorithm != 'GENERIC':
+        # only GENERIC's hellos go out as text
+        assert 'str' not in binary.type_bytes
@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim import Sim
+from simulator.config import EVENT_TYPE, ROUTE_ALGORITHM
+from simulator.convergence import Convergence_Tracker
+
+
+# The tracker takes the network to be quiet when Topology.in_flight_count() is 0.  That
+# count must be the number of deliveries still queued, at the end of every time, and
+# must come back to 0 once the run is over.
+EVENT_FILES = ['testing_suite/case_%d.event' % i for i in (3, 4, 7, 9)] + \
+    ['adversarial_cases/delete_and_rebuild.event', 'adversarial_cases/island_node.event']
+
+
+def queued_deliveries(sim):
+    count = 0
+    for e in sim.event_queue.q.events():
+        if e.event_type == EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL:
+            count += e.arg3 == -1 or not e.arg3.cancelled
+        elif e.event_type == EVENT_TYPE.ROUTING_MESSAGE_FANOUT:
+            handles = [-1] * len(e.arg1) if e.arg3 == -1 else e.arg3
+            count += sum(handle == -1 or not handle.cancelled for handle in handles)
+    return count
+
+
+@pytest.mark.parametrize('drop_in_flight', [False, True])
+@pytest.mark.parametrize('algorithm', ROUTE_ALGORITHM)
+@pytest.mark.parametrize('event_file', EVENT_FILES)
+def test_in_flight_count(monkeypatch, algorithm, event_file, drop_in_flight):
+    counts = []
+    tick_ended = Convergence_Tracker.tick_ended
+
+    def check(self, time):
+        counts.append(self.sim.in_flight_count())
+        assert counts[-1] == queued_deliveries(self.sim)
+        tick_ended(self, time)
+
+    monkeypatch.setattr(Convergence_Tracker, 'tick_ended', check)
+    s = Sim(algorithm, os.path.join(ROOT, event_file), 'NO_STOP', render=False, drop_in_flight=drop_in_flight,
+            convergence=True)
+    assert max(counts) > 0
+    assert s.in_flight_count() == 0
+    assert s.sent_count == s.message_count + s.dropped_count
+    # the last batch has all the time it needs
+    assert s.convergence.records[-1]['converged']
+
+
+# GENERIC sends one hello each way over a new link: the first batch is still on its way
+# when the second one comes, the second goes quiet when its hellos are in.
+BATCHES = """0 ADD_NODE 1
+0 ADD_NODE 2
+0 ADD_NODE 3
+1 ADD_LINK 1 2 10
+5 ADD_LINK 2 3 20
+5 ADD_LINK 1 3 4
+"""
+
+
+def test_records(tmp_path):
+    event_file = tmp_path / 'batches.event'
+    event_file.write_text(BATCHES)
+    s = Sim('GENERIC', str(event_file), 'NO_STOP', render=False, convergence=True)
+    first, second = s.convergence.records
+    assert (first['time'], first['converged'], first['convergence_time']) == (1, False, None)
+    assert first['messages'] == 0  # the hellos of 1-2 land at 11, after the second batch
+    assert (second['time'], second['changes'], second['converged']) == (5, {EVENT_TYPE.ADD_LINK: 2}, True)
+    assert (second['quiet_at'], second['convergence_time'], second['messages']) == (25, 20, 6)
+    assert second['bytes'] == 6 * len("hello")
+    assert second['nodes_touched'] == 3
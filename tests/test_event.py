@@ -0,0 +1,73 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulator.config import EVENT_TYPE
+from simulator.event import Event
+
+
+# Every event type must reach the same Topology method, with the same arguments, as the
+# elif chain the kind-indexed table replaced.
+HANDLED = {
+    EVENT_TYPE.ADD_NODE: ('add_node', 1),
+    EVENT_TYPE.ADD_LINK: ('add_link', 3),
+    EVENT_TYPE.CHANGE_LINK: ('change_link', 3),
+    EVENT_TYPE.DELETE_LINK: ('delete_link', 2),
+    EVENT_TYPE.DELETE_NODE: ('delete_node', 1),
+    EVENT_TYPE.PRINT: ('print_comment', 1),
+    EVENT_TYPE.DUMP_NODE: ('dump_node', 1),
+    EVENT_TYPE.DRAW_TOPOLOGY: ('draw_topology', 0),
+    EVENT_TYPE.ROUTING_MESSAGE_ARRIVAL: ('routing_message_arrival', 3),
+    EVENT_TYPE.ROUTING_MESSAGE_FANOUT: ('routing_message_fanout', 3),
+    EVENT_TYPE.DUMP_SIM: ('dump_sim', 0),
+    EVENT_TYPE.DRAW_PATH: ('draw_path', 2),
+    EVENT_TYPE.DRAW_TREE: ('draw_tree', 1),
+    EVENT_TYPE.VERIFY_ALL: ('verify_all', 0),
+    EVENT_TYPE.VERIFY_SAMPLE: ('verify_sample', 1),
+    EVENT_TYPE.SET_AREA: ('set_area', 2),
+    EVENT_TYPE.SEND_LINK: ('send_link', 3),
+}
+
+
+class Recorder:
+    # stands in for the simulation and records the method calls made on it
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        return lambda *args: self.calls.append((name, args))
+
+
+def test_every_type_handled():
+    assert sorted(HANDLED) == sorted(v for k, v in vars(EVENT_TYPE).items() if not k.startswith('_'))
+
+
+@pytest.mark.parametrize('event_type', sorted(HANDLED))
+def test_dispatch(event_type):
+    sim = Recorder()
+    e = Event(7, event_type, sim, 11, 12, 13)
+    assert e.event_type == event_type
+    assert e.phase == (1 if event_type == EVENT_TYPE.SEND_LINK else 0)
+    e.dispatch()
+    method, arity = HANDLED[event_type]
+    assert sim.calls == [(method, (11, 12, 13)[:arity])]
+
+
+def test_unknown_command():
+    # an unknown command from an event file does nothing, and keeps its name
+    sim = Recorder()
+    e = Event(3, 'NO_SUCH_COMMAND', sim, 5)
+    assert Event(4, 'NO_SUCH_COMMAND', sim).kind == e.kind
+    e.dispatch()
+    assert sim.calls == []
+    assert str(e) == "Time_Stamp: 3 Event_Type: NO_SUCH_COMMAND 5"
+    assert e.phase == 0
+
+
+def test_slots():
+    with pytest.raises(AttributeError):
+        Event(0, EVENT_TYPE.PRINT, None).extra = 1
@@ -0,0 +1,112 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulator.config import EVENT_TYPE
+from simulator.event import Event
+from simulator.event_queue import Calendar_Queue, Event_Queue, Heap_Queue
+
+
+# The queue must hand out events by time stamp, with SEND_LINK after every other event of
+# the same time, and then in posting order.  Reference_Queue gets that order the slow
+# way, by taking the least (time_stamp, phase, posting index) every time.
+RING_SIZE = Calendar_Queue.RING_SIZE
+POP = None
+
+
+class Reference_Queue:
+    def __init__(self):
+        self.q = []
+        self.posted = 0
+        self.Current_Time = 0
+
+    def Post(self, e):
+        self.q.append((e.time_stamp, e.phase, self.posted, e))
+        self.posted += 1
+
+    def Get_Earliest(self):
+        if not self.q:
+            return None
+        key = min(self.q)
+        self.q.remove(key)
+        self.Current_Time = key[0]
+        return key[3]
+
+
+def event(time_stamp, send_link=False):
+    return Event(time_stamp, EVENT_TYPE.SEND_LINK if send_link else EVENT_TYPE.PRINT, None)
+
+
+def replay(operations):
+    # post the events and pop at every POP, then pop what is left, in both queues
+    q, reference = Event_Queue(), Reference_Queue()
+    popped, expected = [], []
+    for e in operations + [POP] * len(operations):
+        if e is POP:
+            popped.append(q.Get_Earliest())
+            expected.append(reference.Get_Earliest())
+        else:
+            q.Post(e)
+            reference.Post(e)
+    assert popped == expected
+    assert q.Size() == 0
+    return q
+
+
+def random_events(seed, count, span):
+    rng = random.Random(seed)
+    return [event(rng.randrange(span), rng.random() < 0.2) for _ in range(count)]
+
+
+@pytest.mark.parametrize('operations', [
+    # SEND_LINK runs last within its second, whenever it was posted
+    [event(5, True), event(5), event(4, True), event(5), event(4)],
+    # ties break by posting order
+    [event(3) for _ in range(10)] + [event(3, True) for _ in range(10)],
+    # past the ring: overflow lists, moved into the ring as time advances
+    [event(0), event(3 * RING_SIZE + 7, True), event(RING_SIZE - 1), event(RING_SIZE), event(2 * RING_SIZE),
+     event(3 * RING_SIZE + 7), event(1), event(RING_SIZE, True)],
+    # an empty ring jumps to the next overflow time
+    [event(10 * RING_SIZE), event(20 * RING_SIZE), POP, event(10 * RING_SIZE + 5), event(25 * RING_SIZE)],
+    random_events(1, 500, 5 * RING_SIZE),
+    random_events(2, 500, 8),
+], ids=['send_link_last', 'fifo_ties', 'overflow', 'jump', 'random_wide', 'random_narrow'])
+def test_calendar_order(operations):
+    assert isinstance(replay(operations).q, Calendar_Queue)
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_calendar_order_while_running(seed):
+    # as in a run: events are posted while others are handed out, at the current time
+    # or later, sometimes well past the ring
+    rng = random.Random(seed)
+    q, reference = Event_Queue(), Reference_Queue()
+    for _ in range(3000):
+        if rng.random() < 0.45:
+            assert q.Get_Earliest() == reference.Get_Earliest()
+        else:
+            delay = rng.choice([0, 0, 1, rng.randrange(50), rng.randrange(3 * RING_SIZE)])
+            e = event(reference.Current_Time + delay, rng.random() < 0.3)
+            q.Post(e)
+            reference.Post(e)
+    while reference.q:
+        assert q.Get_Earliest() == reference.Get_Earliest()
+    assert q.Get_Earliest() is None
+    assert isinstance(q.q, Calendar_Queue)
+
+
+@pytest.mark.parametrize('operations', [
+    # a time stamp that is not an integer
+    [event(4), event(2, True), event(RING_SIZE + 3), event(2.5), event(2), event(3.0, True), event(2.5)],
+    # a time stamp before the current time
+    [event(10), event(20, True), event(20), POP, event(5), event(15, True), event(5)],
+    # the events already queued, in the ring and past it, keep their order
+    random_events(3, 200, 3 * RING_SIZE) + [event(0.5)] + random_events(4, 200, 3 * RING_SIZE),
+], ids=['not_int', 'past', 'random'])
+def test_heap_fallback(operations):
+    assert isinstance(replay(operations).q, Heap_Queue)
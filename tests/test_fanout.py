@@ -0,0 +1,54 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim import Sim
+from simulator.config import ROUTE_ALGORITHM
+from simulator.topology import Topology
+
+
+# send_to_neighbors posts one fan-out event per arrival time.  Every message must still
+# reach the same node at the same time, in the same order, as when each neighbor gets
+# an event of its own.  case_8 and case_10 are left out: they take a minute or more.
+EVENT_FILES = [f for f in sorted(glob.glob(os.path.join(ROOT, 'testing_suite', '*.event')))
+               if os.path.basename(f) not in ('case_8.event', 'case_10.event')] + \
+    [os.path.join(ROOT, 'adversarial_cases', 'delete_and_rebuild.event')]
+
+
+def send_one_by_one(self, node, m):
+    for neighbor in list(self.adj[node]):
+        self.send_to_neighbor(node, neighbor, m)
+
+
+def deliveries(monkeypatch, algorithm, event_file, fanout, drop_in_flight):
+    trace = []
+    arrival = Topology.routing_message_arrival
+
+    def record(self, neighbor, m, handle=-1):
+        trace.append((self.get_time(), neighbor, m))
+        arrival(self, neighbor, m, handle)
+
+    with monkeypatch.context() as patch:
+        patch.setattr(Topology, 'routing_message_arrival', record)
+        if not fanout:
+            patch.setattr(Topology, 'send_to_neighbors', send_one_by_one)
+        s = Sim(algorithm, event_file, 'NO_STOP', render=False, drop_in_flight=drop_in_flight)
+    return trace, s
+
+
+@pytest.mark.parametrize('drop_in_flight', [False, True])
+@pytest.mark.parametrize('algorithm', [a for a in ROUTE_ALGORITHM if a != 'GENERIC'])
+@pytest.mark.parametrize('event_file', EVENT_FILES, ids=os.path.basename)
+def test_same_deliveries(monkeypatch, algorithm, event_file, drop_in_flight):
+    fanout_trace, fanout = deliveries(monkeypatch, algorithm, event_file, True, drop_in_flight)
+    plain_trace, plain = deliveries(monkeypatch, algorithm, event_file, False, drop_in_flight)
+    assert fanout_trace == plain_trace
+    assert fanout.checks == plain.checks
+    assert (fanout.message_count, fanout.dropped_count) == (plain.message_count, plain.dropped_count)
+    # fewer events, unless no two neighbors of a node ever share a latency
+    assert fanout.event_queue.Events_Popped <= plain.event_queue.Events_Popped
@@ -0,0 +1,136 @@
+import contextlib
+import hashlib
+import io
+import os
+import random
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_simulation import MODELS, Edge_Pool, generate_model, generate_simulation
+
+
+# The generator must write the same file for the same seed, and the file the version
+# that kept its links in a plain list wrote: Edge_Pool must pick, iterate and find links
+# in list order.
+def generate(tmp_path, generator, *args, **kwargs):
+    prefix = str(tmp_path / 'generated')
+    with contextlib.redirect_stdout(io.StringIO()):
+        generator(*args, filename=prefix, **kwargs)
+    with open(prefix + '.event', 'rb') as f:
+        return f.read()
+
+
+# sha256 of the files the list version wrote for these (n, degree, time, areas, seed)
+@pytest.mark.parametrize('n, degree, time, areas, seed, digest', [
+    (20, 3, 1000, 1, 1, '6fc59a56a5fb36cc8b0c6dd942efb3502b0536a888dd71a4309d7f40e26a965d'),
+    (50, 4, 2000, 1, 2, 'eccb180891267d69d020cdd0826e1769276b014aa41bbb3e97d627768bda3768'),
+    (60, 3, 1000, 4, 3, 'cd546b587fb9ff49e7e44ca16bf92c1463b87e4090ca1d191240ab7d89add852'),
+    (30, 2, 500, 3, 4, 'f510b7675066d9d1ae1097bd8ed6a4f1b7d09f879c741f92f85f26e3e55c1e81'),
+])
+def test_same_file_as_list_version(tmp_path, n, degree, time, areas, seed, digest):
+    data = generate(tmp_path, generate_simulation, n, degree, time, areas=areas, seed=seed)
+    assert hashlib.sha256(data).hexdigest() == digest
+    assert generate(tmp_path, generate_simulation, n, degree, time, areas=areas, seed=seed) == data
+    assert generate(tmp_path, generate_simulation, n, degree, time, areas=areas, seed=seed + 100) != data
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_edge_pool_matches_list(seed):
+    # random appends and removals, checked against a list after every step
+    rng = random.Random(seed)
+    pool, links = Edge_Pool(), []
+    for _ in range(2000):
+        choice = rng.random()
+        if choice < 0.55 or not links:
+            a, b = rng.sample(range(40), 2)
+            if pool.has(a, b):
+                continue
+            link = (a, b, rng.randint(1, 10))
+            pool.append(link)
+            links.append(link)
+        elif choice < 0.95:
+            link = rng.choice(links)
+            pool.remove(link)
+            links.remove(link)
+        else:
+            node = rng.randrange(40)
+            pool.remove_node(node)
+            links = [link for link in links if node not in link[:2]]
+        assert len(pool) == len(links)
+        assert list(pool) == links
+        assert [pool[k] for k in range(len(links))] == links
+        node = rng.randrange(40)
+        assert pool.links_of(node) == [link for link in links if node in link[:2]]
+        assert pool.neighbors(node) == [link[1] if link[0] == node else link[0]
+                                        for link in links if node in link[:2]]
+        a, b = rng.sample(range(40), 2)
+        assert pool.has(a, b) == any({a, b} == set(link[:2]) for link in links)
+    with pytest.raises(IndexError):
+        pool[len(links)]
+
+
+# Every model and churn process must also give the same file for the same seed, and a file
+# the simulator can replay as written: links come up between live nodes and are not
+# there yet, only links that are up go down, only live nodes fail, in time order.
+CHURN = {
+    'flaps': dict(interval=20),
+    'failures': dict(interval=0, failures=30),
+    'correlated': dict(interval=0, correlated=40, correlated_size=4),
+    'all': dict(interval=15, failures=50, correlated=60),
+}
+
+
+def replay(data):
+    alive, links, last = set(), set(), 0
+    counts = dict.fromkeys(['ADD_LINK', 'DELETE_LINK', 'DELETE_NODE'], 0)
+    for line in data.decode().splitlines():
+        time, command, *args = line.split()
+        time, args = int(time), [int(arg) for arg in args]
+        assert time >= last
+        last = time
+        if command == 'ADD_NODE':
+            alive.add(args[0])
+        elif command == 'ADD_LINK':
+            assert args[0] in alive and args[1] in alive and args[0] != args[1]
+            assert frozenset(args[:2]) not in links
+            links.add(frozenset(args[:2]))
+        elif command == 'DELETE_LINK':
+            links.remove(frozenset(args))
+        elif command == 'DELETE_NODE':
+            alive.remove(args[0])
+            links = {link for link in links if args[0] not in link}
+        else:
+            assert command == 'VERIFY_SAMPLE'
+        counts[command] = counts.get(command, 0) + 1
+    return counts
+
+
+@pytest.mark.parametrize('churn', sorted(CHURN))
+@pytest.mark.parametrize('model', sorted(MODELS))
+def test_model_deterministic(tmp_path, model, churn):
+    data = generate(tmp_path, generate_model, model, 40, 3, 500, seed=7, **CHURN[churn])
+    assert generate(tmp_path, generate_model, model, 40, 3, 500, seed=7, **CHURN[churn]) == data
+    assert generate(tmp_path, generate_model, model, 40, 3, 500, seed=8, **CHURN[churn]) != data
+    counts = replay(data)
+    assert counts['VERIFY_SAMPLE'] == 1
+    assert (counts['DELETE_NODE'] > 0) == (churn in ('failures', 'all'))
+    assert counts['DELETE_LINK'] > 0 or churn == 'failures'
+
+
+@pytest.mark.parametrize('args', [
+    ['--failures', '30'],
+    ['--down-time', '20'],
+    ['--model', 'grid', '--areas', '2'],
+])
+def test_ignored_options_rejected(tmp_path, args):
+    prefix = str(tmp_path / 'rejected')
+    result = subprocess.run([sys.executable, os.path.join(ROOT, 'generate_simulation.py'), '--out', prefix] + args,
+                            capture_output=True, text=True)
+    assert result.returncode == 2
+    assert 'error' in result.stderr
+    assert not os.path.exists(prefix + '.event')
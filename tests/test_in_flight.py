@@ -0,0 +1,84 @@
+import glob
+import logging
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim import Sim
+from simulator.config import ROUTE_ALGORITHM
+from simulator.topology import Topology
+
+
+# GENERIC sends one hello each way over every new link, so the messages on a link when it
+# goes away can be counted by hand.  Links of latency 100 added at time 1 still carry
+# their hellos at time 50, links of latency 10 or less do not.
+DELETE_LINK = """0 ADD_NODE 1
+0 ADD_NODE 2
+0 ADD_NODE 3
+0 ADD_NODE 4
+1 ADD_LINK 1 2 100
+1 ADD_LINK 2 3 10
+1 ADD_LINK 3 4 100
+50 DELETE_LINK 1 2
+50 DELETE_LINK 2 3
+60 ADD_LINK 1 2 5
+"""
+
+DELETE_NODE = """0 ADD_NODE 1
+0 ADD_NODE 2
+0 ADD_NODE 3
+0 ADD_NODE 4
+1 ADD_LINK 1 2 100
+1 ADD_LINK 2 3 100
+1 ADD_LINK 2 4 3
+1 ADD_LINK 3 4 100
+50 DELETE_NODE 2
+"""
+
+EVENT_FILES = [os.path.join(ROOT, 'testing_suite', 'case_%d.event' % i) for i in (3, 4, 5, 7, 9)] + \
+    sorted(glob.glob(os.path.join(ROOT, 'adversarial_cases', '*.event')))
+
+
+def run(event_file, drop_in_flight):
+    return Sim('GENERIC', event_file, 'NO_STOP', render=False, drop_in_flight=drop_in_flight)
+
+
+@pytest.mark.parametrize('events, sent, dropped', [
+    (DELETE_LINK, 8, 2),  # the two hellos of 1-2; those of 2-3 are already in
+    (DELETE_NODE, 8, 4),  # the hellos of 1-2 and 2-3, not those of 2-4 or 3-4
+], ids=['delete_link', 'delete_node'])
+def test_dropped_count(tmp_path, events, sent, dropped):
+    event_file = tmp_path / 'in_flight.event'
+    event_file.write_text(events)
+    s = run(str(event_file), True)
+    assert (s.sent_count, s.dropped_count, s.message_count) == (sent, dropped, sent - dropped)
+    assert not any(s.in_flight.values())
+    # without the flag the same messages are all delivered
+    s = run(str(event_file), False)
+    assert (s.sent_count, s.dropped_count, s.message_count) == (sent, 0, sent)
+
+
+@pytest.mark.parametrize('algorithm', ROUTE_ALGORITHM)
+@pytest.mark.parametrize('event_file', EVENT_FILES, ids=os.path.basename)
+def test_every_message_accounted_for(algorithm, event_file):
+    # a message is delivered or dropped, never both, and none is left on a link
+    s = Sim(algorithm, event_file, 'NO_STOP', render=False, drop_in_flight=True)
+    assert s.message_count + s.dropped_count == s.sent_count
+    assert s.in_flight_count() == 0
+    assert not any(s.in_flight.values())
+
+
+def test_single_step_shows_handles(monkeypatch, caplog):
+    # the messages on their way carry an In_Flight handle, which must print the same
+    # way on every run
+    monkeypatch.setattr(Topology, 'wait', lambda self: None)
+    caplog.set_level(logging.INFO, logger='Sim')
+    Sim('GENERIC', os.path.join(ROOT, 'testing_suite', 'case_3.event'), 'SINGLE_STEP', render=False,
+        drop_in_flight=True)
+    events = [r.getMessage() for r in caplog.records if 'Event_Type: ROUTING_MESSAGE' in r.getMessage()]
+    assert events
+    assert all('In_Flight(' in e and ' object at ' not in e for e in events)
@@ -0,0 +1,41 @@
+import glob
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from generate_simulation import MODELS, generate_model
+from link_state_node import Link_State_Node
+from sim import Sim
+
+
+# Runs LINK_STATE with CHECK_SPF on, so every shortest path tree the node repairs is
+# compared with a full SPF and a mismatch raises AssertionError out of the run.  A node
+# builds its tree on the first query, so the routes of every node are also checked
+# whenever the network converges: the later changes then repair real trees.  Only the
+# SPF has to match here: the routes of some scenarios (node deletions, islands) are
+# wrong for reasons of their own.
+EVENT_FILES = sorted(glob.glob(os.path.join(ROOT, 'testing_suite', '*.event')))
+
+
+def run_checked(monkeypatch, event_file):
+    monkeypatch.setattr(Link_State_Node, 'CHECK_SPF', True)
+    s = Sim('LINK_STATE', event_file, 'NO_STOP', render=False, check_convergence=True)
+    assert s.convergence.records
+
+
+@pytest.mark.parametrize('event_file', EVENT_FILES, ids=os.path.basename)
+def test_testing_suite(monkeypatch, event_file):
+    run_checked(monkeypatch, event_file)
+
+
+@pytest.mark.parametrize('model', sorted(MODELS))
+@pytest.mark.parametrize('seed', [1, 2])
+def test_generated_model(monkeypatch, tmp_path, model, seed):
+    # small networks with busy churn and failures, so the trees are repaired often
+    prefix = str(tmp_path / model)
+    generate_model(model, 40, 3, 200, prefix, seed=seed, interval=10, failures=3, correlated=1)
+    run_checked(monkeypatch, prefix + '.event')
@@ -0,0 +1,78 @@
+import os
+import random
+import sys
+
+import networkx as nx
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from simulator.shortest_path_tree import Shortest_Path_Tree
+
+
+# After every link added, changed or removed, the repaired tree must give the distances of
+# a fresh Dijkstra (networkx), be a tree of shortest paths, and give the first hops of its
+# own paths, cached or not.  Costs are drawn from a small range so ties are common.
+def random_changes(rng, n, count):
+    adj = {node: {} for node in range(n)}
+    for _ in range(count):
+        links = [(a, b) for a in adj for b in adj[a] if a < b]
+        choice = rng.random()
+        if choice < 0.45 or not links:
+            a, b = rng.sample(range(n), 2)
+            old = adj[a].get(b)
+            new = rng.randint(1, 4)
+        elif choice < 0.75:
+            a, b = rng.choice(links)
+            old, new = adj[a][b], rng.randint(1, 4)
+        else:
+            a, b = rng.choice(links)
+            old, new = adj[a][b], None
+        yield adj, a, b, old, new
+
+
+def apply(adj, a, b, new):
+    if new is None:
+        del adj[a][b], adj[b][a]
+    else:
+        adj[a][b] = adj[b][a] = new
+
+
+def check(tree, adj):
+    g = nx.Graph()
+    g.add_nodes_from(adj)
+    g.add_weighted_edges_from((a, b, cost) for a in adj for b, cost in adj[a].items())
+    assert tree.dist == nx.single_source_dijkstra_path_length(g, tree.source)
+    paths = tree.paths()
+    assert set(paths) == set(tree.dist)
+    for node, parent in tree.pred.items():
+        if parent is None:
+            assert node == tree.source
+            continue
+        assert tree.dist[node] == tree.dist[parent] + adj[parent][node]
+        assert node in tree.children[parent]
+        assert tree.path(node) == paths[node]
+        assert tree.get_first_hop(node) == paths[node][1]
+    assert sum(len(children) for children in tree.children.values()) == len(tree.pred) - 1
+
+
+@pytest.mark.parametrize('n, count', [(6, 200), (15, 400), (40, 600)])
+@pytest.mark.parametrize('seed', range(4))
+def test_repair_matches_dijkstra(seed, n, count):
+    rng = random.Random(seed)
+    trees = None
+    for adj, a, b, old, new in random_changes(rng, n, count):
+        if trees is None:
+            trees = [Shortest_Path_Tree(adj, source) for source in (0, n // 2, n - 1)]
+        apply(adj, a, b, new)
+        for tree in trees:
+            tree.update_link(a, b, old, new)
+            check(tree, adj)
+
+
+def test_unchanged_cost():
+    adj = {0: {1: 2}, 1: {0: 2, 2: 1}, 2: {1: 1}}
+    tree = Shortest_Path_Tree(adj, 0)
+    tree.update_link(1, 2, 1, 1)
+    check(tree, adj)
@@ -0,0 +1,130 @@
+import contextlib
+import io
+import logging
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sim import Sim
+from simulator.config import ROUTE_ALGORITHM_NODE
+from simulator.topology import Topology
+
+
+# get_user_path memoizes the walks per destination.  It must give the path, length and
+# warnings of the plain walk below, the one it replaced, whatever the order of the
+# queries and whatever the next hops do.
+def plain_user_path(self, source, destination):
+    path = [source]
+    length = 0
+    while destination not in path:
+        next = self.nodes[path[-1]].get_next_hop(destination)
+        if next == None:
+            self.logging.warning("Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
+            return [], float("inf")
+        elif next == -1 or next not in self.adj or next in path:
+            path.append(next)
+            self.logging.warning(
+                "Your algorithm cannot find a path from %d to %d. Output: %s." % (source, destination, str(path)))
+            return [], float("inf")
+        elif next not in self.adj[path[-1]]:
+            self.logging.warning("Link from %d to %d does not exist, you cannot use it" % (path[-1], next))
+            path.append(next)
+            return [], float("inf")
+        length += self.adj[path[-1]][next]
+        path.append(next)
+    return path, length
+
+
+class Stub_Node:
+    def __init__(self, hops):
+        self.hops = hops
+        self.asked = 0
+
+    def get_next_hop(self, destination):
+        self.asked += 1
+        return self.hops[destination]
+
+
+def random_network(seed, n):
+    # next hops that are right three times out of four, and otherwise loop, stop, or
+    # point at a node that is not a neighbor or does not exist
+    rng = random.Random(seed)
+    t = Topology('GENERIC', render=False)
+    t.adj = {node: {} for node in range(n)}
+    for node in range(n - 1):
+        t.adj[node][node + 1] = t.adj[node + 1][node] = rng.randint(1, 3)
+    for _ in range(n):
+        a, b = rng.sample(range(n), 2)
+        t.adj[a][b] = t.adj[b][a] = rng.randint(1, 9)
+    for node in range(n):
+        tree = t.shortest_path_tree(node)
+        t.nodes[node] = Stub_Node({d: tree.get_first_hop(d) if rng.random() < 0.75 else
+                                   rng.choice([-1, None, node, n + 3] + list(range(n))) for d in range(n)})
+    return t
+
+
+def walk(t, caplog, get_user_path, queries):
+    caplog.clear()
+    results = [get_user_path(t, source, destination) for source, destination in queries]
+    return results, [r.getMessage() for r in caplog.records]
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('n', [5, 30])
+def test_same_paths(caplog, seed, n):
+    caplog.set_level(logging.WARNING, logger='Sim')
+    t = random_network(seed, n)
+    queries = [(s, d) for s in range(n) for d in range(n) if s != d]
+    random.Random(seed).shuffle(queries)
+    assert walk(t, caplog, Topology.get_user_path, queries) == walk(t, caplog, plain_user_path, queries)
+    # asked once per (node, destination) at most
+    t.user_routes.clear()
+    for node in t.nodes.values():
+        node.asked = 0
+    walk(t, caplog, Topology.get_user_path, queries)
+    assert all(node.asked <= n for node in t.nodes.values())
+
+
+# Whole runs print and log the same with either walk, so the memo is dropped whenever
+# a route can change.  case_8 and case_10 are left out: they take a minute or more.
+# 'converging' draws trees while the routing messages are still on their way, with no
+# change to the topology in between.
+EVENT_FILES = ['testing_suite/case_%d.event' % i for i in (1, 2, 3, 4, 5, 6, 7, 9)] + \
+    ['adversarial_cases/%s.event' % name for name in ('delete_and_rebuild', 'island_link', 'island_node', 'areas')] + \
+    ['converging']
+
+CONVERGING = "".join("0 ADD_NODE %d\n" % node for node in range(1, 7)) + \
+    "".join("1 ADD_LINK %d %d %d\n" % link for link in [(1, 2, 7), (2, 3, 3), (3, 4, 9), (4, 5, 2), (5, 6, 8),
+                                                         (6, 1, 4), (1, 4, 20), (2, 5, 11)]) + \
+    "".join("%d DRAW_TREE %d\n" % (time, time % 6 + 1) for time in range(2, 60, 3)) + \
+    "60 CHANGE_LINK 2 3 30\n" + "".join("%d DRAW_TREE 3\n" % time for time in range(61, 100, 2)) + \
+    "100 DELETE_LINK 6 1\n" + "".join("%d DRAW_TREE 1\n" % time for time in range(101, 140, 2))
+
+
+def output(monkeypatch, caplog, algorithm, event_file, get_user_path):
+    caplog.clear()
+    out = io.StringIO()
+    with monkeypatch.context() as patch, contextlib.redirect_stdout(out):
+        patch.setattr(Topology, 'get_user_path', get_user_path)
+        s = Sim(algorithm, event_file, 'NO_STOP', render=False)
+    return out.getvalue(), [r.getMessage() for r in caplog.records], s.checks
+
+
+@pytest.mark.parametrize('coalesce', [True, False])
+@pytest.mark.parametrize('algorithm', ['GENERIC', 'DISTANCE_VECTOR', 'LINK_STATE', 'LINK_STATE_AREA'])
+@pytest.mark.parametrize('event_file', EVENT_FILES)
+def test_same_output(monkeypatch, caplog, tmp_path, algorithm, event_file, coalesce):
+    # without coalescing, nothing runs at the end of a time to drop the memo after a message
+    monkeypatch.setattr(ROUTE_ALGORITHM_NODE[algorithm], 'COALESCE', coalesce, raising=False)
+    caplog.set_level(logging.INFO, logger='Sim')
+    if event_file == 'converging':
+        event_file = tmp_path / 'converging.event'
+        event_file.write_text(CONVERGING)
+    event_file = os.path.join(ROOT, event_file)
+    assert output(monkeypatch, caplog, algorithm, event_file, Topology.get_user_path) == \
+        output(monkeypatch, caplog, algorithm, event_file, plain_user_path)
@@ -0,0 +1,122 @@
+import os
+import random
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import simulator.verify
+from sim import Sim
+from simulator.topology import Topology
+from simulator.verify import verify_routes
+
+
+# VERIFY_ALL and VERIFY_SAMPLE must find exactly the (source, destination) pairs whose
+# route DRAW_TREE finds wrong, whatever the next hops do: loop, stop at a node with no
+# route, point at a node that is not a neighbor or does not exist.
+class Stub_Node:
+    def __init__(self, hops):
+        self.hops = hops
+
+    def get_next_hop(self, destination):
+        return self.hops.get(destination, -1)
+
+
+def random_network(seed, n):
+    # a sparse graph in a few pieces, so some pairs have no path, one of them along a chain
+    # so some routes are long, and next hops that are right nine times out of ten and
+    # anything else otherwise
+    rng = random.Random(seed)
+    t = Topology('GENERIC', render=False)
+    t.adj = {node: {} for node in range(n)}
+    for node in range(n // 3, n - 1):
+        t.adj[node][node + 1] = t.adj[node + 1][node] = 1
+    for _ in range(n // 2):
+        a, b = rng.sample(range(n), 2)
+        if (a < n // 3) == (b < n // 3):
+            t.adj[a][b] = t.adj[b][a] = rng.randint(1, 5)
+    for node in range(n):
+        tree = t.shortest_path_tree(node)
+        hops = {}
+        for destination in range(n):
+            if rng.random() < 0.9 and destination in tree.dist and destination != node:
+                hops[destination] = tree.get_first_hop(destination)
+            else:
+                hops[destination] = rng.choice([-1, None, node, n + 7] + list(t.adj[node]) + list(range(n)))
+        t.nodes[node] = Stub_Node(hops)
+    return t
+
+
+def draw_tree_mismatches(t, destinations):
+    # the pairs DRAW_TREE reports, and the number of pairs it compares
+    mismatches, checked = set(), 0
+    for source in t.adj:
+        _, correct = t.get_correct_path_dict(source)
+        _, user = t.get_user_path_dict(source)
+        for (_, destination), length in correct.items():
+            if destination in destinations:
+                checked += 1
+                if user[(source, destination)] != length:
+                    mismatches.add((source, destination))
+    return mismatches, checked
+
+
+@pytest.mark.parametrize('dijkstra_ratio, chunk', [(32, 256), (0, 256), (10 ** 6, 256), (32, 3)],
+                         ids=['default', 'bellman_ford', 'dijkstra', 'small_chunks'])
+@pytest.mark.parametrize('seed', range(3))
+@pytest.mark.parametrize('n', [20, 60])
+def test_same_mismatches_as_draw_tree(monkeypatch, seed, n, dijkstra_ratio, chunk):
+    monkeypatch.setattr(simulator.verify, 'DIJKSTRA_RATIO', dijkstra_ratio)
+    monkeypatch.setattr(simulator.verify, 'CHUNK', chunk)
+    t = random_network(seed, n)
+    wrong = 0
+    for destinations in [list(t.adj), random.Random(seed).sample(list(t.adj), n // 4)]:
+        checked, mismatches = verify_routes(t.adj, t.nodes, destinations)
+        expected, expected_checked = draw_tree_mismatches(t, set(destinations))
+        assert checked == expected_checked
+        assert {(source, destination) for source, destination, _, _ in mismatches} == expected
+        wrong += len(expected)
+    assert wrong  # the next hops do get some routes wrong
+
+
+@pytest.mark.parametrize('n', [3, 63, 64, 65, 200])
+def test_long_routes(n):
+    # a chain where every next hop is right except that node 1 drops the routes to the
+    # last node: routes of every length up to n - 1 hops, right and wrong
+    t = Topology('GENERIC', render=False)
+    t.adj = {node: {} for node in range(n)}
+    for node in range(n - 1):
+        t.adj[node][node + 1] = t.adj[node + 1][node] = 1
+    for node in range(n):
+        hops = {d: node + (d > node) - (d < node) for d in range(n) if d != node}
+        if node == 1:
+            hops[n - 1] = -1
+        t.nodes[node] = Stub_Node(hops)
+    checked, mismatches = verify_routes(t.adj, t.nodes, list(t.adj))
+    assert checked == n * (n - 1)
+    assert sorted(m[:2] for m in mismatches) == [(0, n - 1), (1, n - 1)]
+
+
+# In a run: VERIFY_ALL at the same time as a DRAW_TREE of every node must pass exactly
+# when all the trees do.  GENERIC's next hops loop and run into dead ends everywhere;
+# LINK_STATE gets only a few routes of areas.event wrong.
+@pytest.mark.parametrize('algorithm', ['GENERIC', 'LINK_STATE', 'LINK_STATE_ROUTER_LSA'])
+def test_verify_all_agrees_with_draw_tree(tmp_path, algorithm):
+    event_file = tmp_path / 'verify.event'
+    with open(os.path.join(ROOT, 'adversarial_cases', 'areas.event')) as f:
+        events = f.read()
+    for time in (1000, 2000, 3000, 4000):
+        events += "%d VERIFY_ALL\n%d VERIFY_SAMPLE 5\n" % (time, time)
+        events += "".join("%d DRAW_TREE %d\n" % (time, node) for node in range(1, 19))
+    event_file.write_text(events)
+    s = Sim(algorithm, str(event_file), 'NO_STOP', render=False)
+    for time in (1000, 2000, 3000, 4000):
+        checks = [c for c in s.checks if c['time'] == time]
+        trees = [c['correct'] for c in checks if c['command'] == 'DRAW_TREE']
+        assert len(trees) >= 18
+        verify_all = [c['correct'] for c in checks if c['command'] == 'VERIFY_ALL']
+        assert verify_all and all(v == all(trees) for v in verify_all)
+        # a sample can only miss mismatches
+        assert all(c['correct'] or not all(trees) for c in checks if c['command'] == 'VERIFY_SAMPLE')